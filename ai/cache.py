@@ -0,0 +1,64 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+
+SQLITE_MAX_PARAMS = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SqliteCache:
+    table: str
+    schema: tuple[str, ...]
+    # Writes between eviction checks even while the tracked entry count stays under the cap.
+    evict_interval = 1000
+
+    def __init__(self, path: str, max_entries: int) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.schema:
+            self._conn.execute(statement)
+        self._conn.commit()
+        (self._entries,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        self._writes = 0
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN "
+                f"(SELECT rowid FROM {self.table} ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+        self._entries = min(count, self.max_entries)
+
+    def _maybe_evict(self, added: int) -> None:
+        # Replaced rows are counted as added, so the tracked count only errs towards checking early.
+        self._entries += added
+        self._writes += added
+        if self._entries <= self.max_entries and self._writes < self.evict_interval:
+            return
+        self._writes = 0
+        self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,69 @@
+import threading
+import time
+from array import array
+from typing import Iterable
+
+from backend.settings import settings
+from ai.cache import SQLITE_MAX_PARAMS, SqliteCache
+
+
+class EmbeddingCache(SqliteCache):
+    table = "embeddings"
+    schema = (
+        "CREATE TABLE IF NOT EXISTS embeddings ("
+        "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL, "
+        "PRIMARY KEY (model, text_hash))",
+        "CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)",
+    )
+
+    def get_many(self, model: str, hashes: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), SQLITE_MAX_PARAMS):
+                batch = unique[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, key) for key in found],
+                )
+                self._conn.commit()
+            hits = sum(1 for key in hashes if key in found)
+            self.hits += hits
+            self.misses += len(hashes) - hits
+        return found
+
+    def put_many(self, model: str, items: Iterable[tuple[str, list[float]]]) -> None:
+        now = time.time()
+        rows = [(model, key, array("f", vector).tobytes(), now) for key, vector in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._maybe_evict(len(rows))
+            self._conn.commit()
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    global _cache
+    if not settings.embed_cache_enabled or settings.embed_cache_max_entries <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(settings.embed_cache_path, settings.embed_cache_max_entries)
+    return _cache
@@ -1,17 +1,68 @@
-from typing import Iterable
-
-import httpx
+from itertools import islice
+from typing import Iterable, Iterator
 
 from backend.settings import settings
+from ai.cache import text_hash
+from ai.embedding_cache import get_embedding_cache
+from ai.executor import run_blocking
+from ai.ollama import apost_json, post_json
+
+
+def _batched(texts: Iterable[str], size: int) -> Iterator[list[str]]:
+    iterator = iter(texts)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
 
-def embed_texts(texts: Iterable[str]) -> list[list[float]]:
+def _embed_uncached(texts: Iterable[str], batch_size: int | None) -> list[list[float]]:
+    size = max(1, batch_size or settings.embed_batch_size)
     embeddings: list[list[float]] = []
-    with httpx.Client(base_url=settings.ollama_base_url, timeout=60.0) as client:
-        for text in texts:
-            payload = {"model": settings.embed_model, "prompt": text}
-            resp = client.post("/api/embeddings", json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            embeddings.append(data["embedding"])
+    for batch in _batched(texts, size):
+        data = post_json("/api/embed", {"model": settings.embed_model, "input": batch})
+        embeddings.extend(data["embeddings"])
     return embeddings
+
+
+def embed_texts(texts: Iterable[str], batch_size: int | None = None) -> list[list[float]]:
+    cache = get_embedding_cache()
+    if cache is None:
+        return _embed_uncached(texts, batch_size)
+
+    texts = list(texts)
+    hashes = [text_hash(text) for text in texts]
+    vectors = cache.get_many(settings.embed_model, hashes)
+
+    pending = {key: text for key, text in zip(hashes, texts) if key not in vectors}
+    if pending:
+        fresh = dict(zip(pending, _embed_uncached(pending.values(), batch_size)))
+        cache.put_many(settings.embed_model, fresh.items())
+        vectors.update(fresh)
+
+    return [vectors[key] for key in hashes]
+
+
+async def _aembed_uncached(texts: Iterable[str], batch_size: int | None) -> list[list[float]]:
+    size = max(1, batch_size or settings.embed_batch_size)
+    embeddings: list[list[float]] = []
+    for batch in _batched(texts, size):
+        data = await apost_json("/api/embed", {"model": settings.embed_model, "input": batch})
+        embeddings.extend(data["embeddings"])
+    return embeddings
+
+
+async def aembed_texts(texts: Iterable[str], batch_size: int | None = None) -> list[list[float]]:
+    cache = get_embedding_cache()
+    if cache is None:
+        return await _aembed_uncached(texts, batch_size)
+
+    texts = list(texts)
+    hashes = [text_hash(text) for text in texts]
+    vectors = await run_blocking(cache.get_many, settings.embed_model, hashes)
+
+    pending = {key: text for key, text in zip(hashes, texts) if key not in vectors}
+    if pending:
+        fresh = dict(zip(pending, await _aembed_uncached(pending.values(), batch_size)))
+        await run_blocking(cache.put_many, settings.embed_model, list(fresh.items()))
+        vectors.update(fresh)
+
+    return [vectors[key] for key in hashes]
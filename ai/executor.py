@@ -0,0 +1,36 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from backend.settings import settings
+
+
+T = TypeVar("T")
+
+# Async callers run blocking work (vector searches, SQLite caches) here instead of on the event loop.
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.vector_store_workers),
+                thread_name_prefix="vector-store",
+            )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+async def run_blocking(fn: Callable[..., T], *args) -> T:
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), fn, *args)
@@ -0,0 +1,139 @@
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+from backend.settings import settings
+from ai.cache import SQLITE_MAX_PARAMS
+
+
+# Compound identifiers ("cc6.1", "aes-256", "iso/iec") are kept whole and also split into their parts.
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-_/][a-z0-9]+)*")
+_PART_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from has have how in is it its of on or our that the this to "
+    "we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    tokens: list[str] = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        parts = _PART_RE.findall(token)
+        if len(parts) > 1:
+            tokens.append(token)
+        tokens.extend(part for part in parts if part not in _STOPWORDS)
+    return tokens
+
+
+class LexicalIndex:
+    schema = (
+        "CREATE TABLE IF NOT EXISTS chunks ("
+        "chunk_id TEXT PRIMARY KEY, document_id TEXT NOT NULL, length INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_chunks_document ON chunks (document_id)",
+        "CREATE TABLE IF NOT EXISTS postings ("
+        "term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, "
+        "PRIMARY KEY (term, chunk_id)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS ix_postings_chunk ON postings (chunk_id)",
+    )
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.schema:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def _delete(self, chunk_ids: list[str]) -> None:
+        for start in range(0, len(chunk_ids), SQLITE_MAX_PARAMS):
+            batch = chunk_ids[start:start + SQLITE_MAX_PARAMS]
+            marks = ",".join("?" * len(batch))
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({marks})", batch)
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({marks})", batch)
+
+    def add(self, chunks: Iterable[tuple[str, str, str]]) -> None:
+        rows = []
+        postings = []
+        for chunk_id, document_id, text in chunks:
+            counts = Counter(tokenize(text))
+            rows.append((chunk_id, document_id, sum(counts.values())))
+            postings.extend((term, chunk_id, tf) for term, tf in counts.items())
+        if not rows:
+            return
+        with self._lock:
+            self._delete([row[0] for row in rows])
+            self._conn.executemany("INSERT INTO chunks (chunk_id, document_id, length) VALUES (?, ?, ?)", rows)
+            self._conn.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", postings)
+            self._conn.commit()
+
+    def document_ids(self) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT DISTINCT document_id FROM chunks")}
+
+    def delete(self, chunk_ids: list[str]) -> None:
+        if not chunk_ids:
+            return
+        with self._lock:
+            self._delete(list(chunk_ids))
+            self._conn.commit()
+
+    def delete_document(self, document_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM postings WHERE chunk_id IN (SELECT chunk_id FROM chunks WHERE document_id = ?)",
+                (document_id,),
+            )
+            self._conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            self._conn.commit()
+
+    def search(self, query: str, top_k: int, document_ids: list[str] | None = None) -> list[tuple[str, float]]:
+        terms = sorted(set(tokenize(query)))[:SQLITE_MAX_PARAMS // 2]
+        if not terms or top_k <= 0 or document_ids == []:
+            return []
+        term_marks = ",".join("?" * len(terms))
+        with self._lock:
+            total, avg_length = self._conn.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            if not total:
+                return []
+            df = dict(self._conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({term_marks}) GROUP BY term", terms
+            ).fetchall())
+            sql = (
+                "SELECT p.chunk_id, p.term, p.tf, c.length FROM postings p "
+                f"JOIN chunks c ON c.chunk_id = p.chunk_id WHERE p.term IN ({term_marks})"
+            )
+            params: list = list(terms)
+            if document_ids is not None:
+                sql += f" AND c.document_id IN ({','.join('?' * len(document_ids))})"
+                params.extend(document_ids)
+            rows = self._conn.execute(sql, params).fetchall()
+
+        idf = {term: math.log(1.0 + (total - n + 0.5) / (n + 0.5)) for term, n in df.items()}
+        avg_length = avg_length or 1.0
+        scores: dict[str, float] = {}
+        for chunk_id, term, tf, length in rows:
+            norm = self.k1 * (1.0 - self.b + self.b * length / avg_length)
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf[term] * tf * (self.k1 + 1.0) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+_index: LexicalIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex | None:
+    global _index
+    if not settings.lexical_index_enabled:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = LexicalIndex(settings.lexical_index_path)
+    return _index
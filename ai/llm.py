@@ -1,17 +1,83 @@
-import httpx
+from typing import AsyncIterator, Iterator
 
 from backend.settings import settings
+from ai.executor import run_blocking
+from ai.llm_cache import get_llm_cache
+from ai.ollama import apost_json, astream_json, post_json, stream_json
 
 
-def generate_answer(prompt: str) -> str:
-    payload = {
+def _generate_payload(prompt: str, stream: bool) -> dict:
+    return {
         "model": settings.llm_model,
         "prompt": prompt,
-        "stream": False,
+        "stream": stream,
         "options": {"temperature": 0.2},
     }
-    with httpx.Client(base_url=settings.ollama_base_url, timeout=120.0) as client:
-        resp = client.post("/api/generate", json=payload)
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("response", "").strip()
+
+
+def generate_answer(prompt: str, use_cache: bool = True) -> str:
+    payload = _generate_payload(prompt, stream=False)
+    cache = get_llm_cache()
+    if cache is not None and use_cache:
+        cached = cache.get(payload["model"], payload["options"], prompt)
+        if cached is not None:
+            return cached
+
+    data = post_json("/api/generate", payload)
+    response = data.get("response", "").strip()
+    if cache is not None:
+        cache.put(payload["model"], payload["options"], prompt, response)
+    return response
+
+
+def stream_answer(prompt: str, use_cache: bool = True) -> Iterator[str]:
+    payload = _generate_payload(prompt, stream=True)
+    cache = get_llm_cache()
+    if cache is not None and use_cache:
+        cached = cache.get(payload["model"], payload["options"], prompt)
+        if cached is not None:
+            yield cached
+            return
+
+    parts: list[str] = []
+    for data in stream_json("/api/generate", payload):
+        token = data.get("response", "")
+        if token:
+            parts.append(token)
+            yield token
+    if cache is not None:
+        cache.put(payload["model"], payload["options"], prompt, "".join(parts).strip())
+
+
+async def agenerate_answer(prompt: str, use_cache: bool = True) -> str:
+    payload = _generate_payload(prompt, stream=False)
+    cache = get_llm_cache()
+    if cache is not None and use_cache:
+        cached = await run_blocking(cache.get, payload["model"], payload["options"], prompt)
+        if cached is not None:
+            return cached
+
+    data = await apost_json("/api/generate", payload)
+    response = data.get("response", "").strip()
+    if cache is not None:
+        await run_blocking(cache.put, payload["model"], payload["options"], prompt, response)
+    return response
+
+
+async def astream_answer(prompt: str, use_cache: bool = True) -> AsyncIterator[str]:
+    payload = _generate_payload(prompt, stream=True)
+    cache = get_llm_cache()
+    if cache is not None and use_cache:
+        cached = await run_blocking(cache.get, payload["model"], payload["options"], prompt)
+        if cached is not None:
+            yield cached
+            return
+
+    parts: list[str] = []
+    async for data in astream_json("/api/generate", payload):
+        token = data.get("response", "")
+        if token:
+            parts.append(token)
+            yield token
+    if cache is not None:
+        await run_blocking(cache.put, payload["model"], payload["options"], prompt, "".join(parts).strip())
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+
+from backend.settings import settings
+from ai.cache import SqliteCache, text_hash
+
+
+class LLMCache(SqliteCache):
+    table = "responses"
+    schema = (
+        "CREATE TABLE IF NOT EXISTS responses ("
+        "model TEXT NOT NULL, options TEXT NOT NULL, prompt_hash TEXT NOT NULL, response TEXT NOT NULL, "
+        "created_at REAL NOT NULL, last_used REAL NOT NULL, "
+        "PRIMARY KEY (model, options, prompt_hash))",
+        "CREATE INDEX IF NOT EXISTS ix_responses_last_used ON responses (last_used)",
+        "CREATE INDEX IF NOT EXISTS ix_responses_created_at ON responses (created_at)",
+    )
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float) -> None:
+        super().__init__(path, max_entries)
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(model: str, options: dict, prompt: str) -> tuple[str, str, str]:
+        return model, json.dumps(options, sort_keys=True), text_hash(prompt)
+
+    def get(self, model: str, options: dict, prompt: str) -> str | None:
+        key = self._key(model, options, prompt)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE model = ? AND options = ? AND prompt_hash = ?",
+                key,
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE model = ? AND options = ? AND prompt_hash = ?",
+                    key,
+                )
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE model = ? AND options = ? AND prompt_hash = ?",
+                (now, *key),
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, model: str, options: dict, prompt: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(model, options, prompt_hash, response, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (*self._key(model, options, prompt), response, now, now),
+            )
+            self._maybe_evict(1)
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        super()._evict()
+
+
+_cache: LLMCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache | None:
+    global _cache
+    if not settings.llm_cache_enabled or settings.llm_cache_max_entries <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache(settings.llm_cache_path, settings.llm_cache_max_entries, settings.llm_cache_ttl_seconds)
+    return _cache
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import threading
+import time
+from typing import AsyncIterator, Iterator
+
+import httpx
+
+from backend.settings import settings
+
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_client: httpx.Client | None = None
+_async_client: httpx.AsyncClient | None = None
+_lock = threading.Lock()
+
+
+def _client_options() -> dict:
+    return {
+        "base_url": settings.ollama_base_url,
+        "timeout": httpx.Timeout(settings.ollama_timeout, connect=settings.ollama_connect_timeout),
+        "limits": httpx.Limits(
+            max_connections=settings.ollama_max_connections,
+            max_keepalive_connections=settings.ollama_max_keepalive,
+        ),
+    }
+
+
+def get_client() -> httpx.Client:
+    global _client
+    with _lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(**_client_options())
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    with _lock:
+        if _async_client is None or _async_client.is_closed:
+            _async_client = httpx.AsyncClient(**_client_options())
+    return _async_client
+
+
+def _should_retry(exc: httpx.HTTPError, attempt: int) -> bool:
+    if attempt >= settings.ollama_retries:
+        return False
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in _RETRY_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+
+def _backoff(attempt: int) -> float:
+    return settings.ollama_retry_backoff * (2 ** attempt)
+
+
+def post_json(path: str, payload: dict) -> dict:
+    attempt = 0
+    while True:
+        try:
+            resp = get_client().post(path, json=payload)
+            resp.raise_for_status()
+            return resp.json()
+        except httpx.HTTPError as exc:
+            if not _should_retry(exc, attempt):
+                raise
+        time.sleep(_backoff(attempt))
+        attempt += 1
+
+
+def stream_json(path: str, payload: dict) -> Iterator[dict]:
+    attempt = 0
+    while True:
+        started = False
+        try:
+            with get_client().stream("POST", path, json=payload) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines():
+                    if line.strip():
+                        started = True
+                        yield json.loads(line)
+            return
+        except httpx.HTTPError as exc:
+            if started or not _should_retry(exc, attempt):
+                raise
+        time.sleep(_backoff(attempt))
+        attempt += 1
+
+
+async def apost_json(path: str, payload: dict) -> dict:
+    attempt = 0
+    while True:
+        try:
+            resp = await get_async_client().post(path, json=payload)
+            resp.raise_for_status()
+            return resp.json()
+        except httpx.HTTPError as exc:
+            if not _should_retry(exc, attempt):
+                raise
+        await asyncio.sleep(_backoff(attempt))
+        attempt += 1
+
+
+async def astream_json(path: str, payload: dict) -> AsyncIterator[dict]:
+    attempt = 0
+    while True:
+        started = False
+        try:
+            async with get_async_client().stream("POST", path, json=payload) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if line.strip():
+                        started = True
+                        yield json.loads(line)
+            return
+        except httpx.HTTPError as exc:
+            if started or not _should_retry(exc, attempt):
+                raise
+        await asyncio.sleep(_backoff(attempt))
+        attempt += 1
+
+
+async def aclose_clients() -> None:
+    global _client, _async_client
+    with _lock:
+        client, _client = _client, None
+        async_client, _async_client = _async_client, None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
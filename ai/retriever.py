@@ -1,20 +1,15 @@
 from typing import Iterable
 
-import chromadb
+import numpy as np
 
 from backend.settings import settings
-from ai.embeddings import embed_texts
-
-
-_client = chromadb.PersistentClient(path=settings.chroma_path)
-
-
-def get_collection():
-    return _client.get_or_create_collection(name="documents", metadata={"hnsw:space": "cosine"})
+from ai.embeddings import aembed_texts, embed_texts
+from ai.executor import run_blocking
+from ai.lexical import get_lexical_index
+from ai.vector_store import get_vector_store
 
 
 def upsert_chunks(chunks: Iterable[dict]) -> None:
-    collection = get_collection()
     chunks = list(chunks)
     if not chunks:
         return
@@ -22,10 +17,151 @@ def upsert_chunks(chunks: Iterable[dict]) -> None:
     embeddings = embed_texts(texts)
     ids = [chunk["id"] for chunk in chunks]
     metadatas = [chunk["metadata"] for chunk in chunks]
-    collection.upsert(ids=ids, documents=texts, embeddings=embeddings, metadatas=metadatas)
+    get_vector_store().upsert(ids, texts, embeddings, metadatas)
+    lexical = get_lexical_index()
+    if lexical is not None:
+        lexical.add((chunk["id"], chunk["metadata"]["document_id"], chunk["text"]) for chunk in chunks)
+
+
+_RESULT_KEYS = ("ids", "documents", "metadatas", "distances")
+
+
+def _document_filter(where: dict | None) -> list[str] | None:
+    if not where:
+        return None
+    condition = where.get("document_id")
+    if isinstance(condition, dict):
+        return list(condition.get("$in", []))
+    return [condition]
+
+
+def _fuse(rankings: list[list[str]], top_k: int) -> list[str]:
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (settings.rrf_k + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)[:top_k]
+
+
+def _hybrid_batch(
+    store,
+    questions: list[str],
+    embeddings: list,
+    batch: dict,
+    top_k: int,
+    document_ids: list[str] | None,
+) -> list[dict]:
+    lexical = get_lexical_index()
+    candidates = max(top_k, settings.hybrid_candidates)
+    fused = []
+    for idx, question in enumerate(questions):
+        keyword_ids = [chunk_id for chunk_id, _ in lexical.search(question, candidates, document_ids)]
+        fused.append(_fuse([batch["ids"][idx], keyword_ids], top_k))
+
+    # Keyword-only hits have no dense distance yet; score them against the stored chunk embeddings.
+    known = {chunk_id for ids in batch["ids"] for chunk_id in ids}
+    missing = sorted({chunk_id for ids in fused for chunk_id in ids} - known)
+    extra: dict[str, tuple] = {}
+    if missing:
+        fetched = store.get(missing)
+        for chunk_id, text, meta, vector in zip(
+            fetched["ids"], fetched["documents"], fetched["metadatas"], fetched["embeddings"]
+        ):
+            extra[chunk_id] = (text, meta, np.asarray(vector, dtype=np.float32))
+
+    results = []
+    for idx, ids in enumerate(fused):
+        dense = {
+            chunk_id: (text, meta, dist)
+            for chunk_id, text, meta, dist in zip(
+                batch["ids"][idx], batch["documents"][idx], batch["metadatas"][idx], batch["distances"][idx]
+            )
+        }
+        query_vector = np.asarray(embeddings[idx], dtype=np.float32)
+        query_norm = np.linalg.norm(query_vector) or 1.0
+        entry = {key: [] for key in _RESULT_KEYS}
+        for chunk_id in ids:
+            if chunk_id in dense:
+                text, meta, dist = dense[chunk_id]
+            elif chunk_id in extra:
+                text, meta, vector = extra[chunk_id]
+                dist = 1.0 - float(vector @ query_vector) / float((np.linalg.norm(vector) or 1.0) * query_norm)
+            else:
+                continue
+            entry["ids"].append(chunk_id)
+            entry["documents"].append(text)
+            entry["metadatas"].append(meta)
+            entry["distances"].append(dist)
+        results.append({key: [value] for key, value in entry.items()})
+    return results
+
+
+def _search(
+    questions: list[str],
+    embeddings: list,
+    top_k: int,
+    where: dict | None,
+    mode: str | None,
+) -> list[dict]:
+    store = get_vector_store()
+    document_ids = _document_filter(where)
+    hybrid = (mode or settings.retrieval_mode) == "hybrid" and get_lexical_index() is not None
+    n_results = max(top_k, settings.hybrid_candidates) if hybrid else top_k
+    size = max(1, settings.query_batch_size)
+    results: list[dict] = []
+    for start in range(0, len(embeddings), size):
+        batch_questions = questions[start:start + size]
+        batch_embeddings = embeddings[start:start + size]
+        batch = store.query(batch_embeddings, n_results, document_ids)
+        if hybrid:
+            results.extend(_hybrid_batch(store, batch_questions, batch_embeddings, batch, top_k, document_ids))
+            continue
+        for idx in range(len(batch["ids"])):
+            results.append({key: [(batch.get(key) or [[]] * len(batch["ids"]))[idx]] for key in _RESULT_KEYS})
+    return results
+
+
+def query_many(questions: list[str], top_k: int, where: dict | None = None, mode: str | None = None) -> list[dict]:
+    if not questions:
+        return []
+    return _search(questions, embed_texts(questions), top_k, where, mode)
+
+
+def query(question: str, top_k: int, where: dict | None = None, mode: str | None = None) -> dict:
+    return query_many([question], top_k, where=where, mode=mode)[0]
+
+
+async def aquery_many(
+    questions: list[str],
+    top_k: int,
+    where: dict | None = None,
+    mode: str | None = None,
+) -> list[dict]:
+    if not questions:
+        return []
+    embeddings = await aembed_texts(questions)
+    return await run_blocking(_search, questions, embeddings, top_k, where, mode)
+
+
+async def aquery(question: str, top_k: int, where: dict | None = None, mode: str | None = None) -> dict:
+    return (await aquery_many([question], top_k, where=where, mode=mode))[0]
+
+
+def delete_document(document_id: str) -> None:
+    get_vector_store().delete_document(document_id)
+    lexical = get_lexical_index()
+    if lexical is not None:
+        lexical.delete_document(document_id)
+
+
+def update_chunk_metadata(ids: list[str], metadatas: list[dict]) -> None:
+    if ids:
+        get_vector_store().update_metadata(ids, metadatas)
 
 
-def query(question: str, top_k: int, where: dict | None = None) -> dict:
-    collection = get_collection()
-    embedding = embed_texts([question])[0]
-    return collection.query(query_embeddings=[embedding], n_results=top_k, where=where)
+def delete_chunks(ids: list[str]) -> None:
+    if ids:
+        get_vector_store().delete(ids)
+        lexical = get_lexical_index()
+        if lexical is not None:
+            lexical.delete(ids)
@@ -0,0 +1,393 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from backend.settings import settings
+from ai.cache import SQLITE_MAX_PARAMS
+
+
+_RESULT_KEYS = ("ids", "documents", "metadatas", "distances")
+_COSINE = {"hnsw:space": "cosine"}
+_BACKFILL_BATCH_SIZE = 1000
+
+_stores: dict[str, type] = {}
+
+
+def register_vector_store(name: str) -> Callable[[type], type]:
+    def decorator(store: type) -> type:
+        _stores[name] = store
+        return store
+    return decorator
+
+
+def _empty_results(count: int) -> dict:
+    return {key: [[] for _ in range(count)] for key in _RESULT_KEYS}
+
+
+def _merge_top_k(results: list[dict], count: int, n_results: int) -> dict:
+    # Hits from several partitions are merged by distance into one top-k list per query.
+    merged = _empty_results(count)
+    for idx in range(count):
+        hits = sorted(
+            (hit for result in results for hit in zip(*(result[key][idx] for key in _RESULT_KEYS))),
+            key=lambda hit: hit[3],
+        )
+        for hit in hits[:n_results]:
+            for key, value in zip(_RESULT_KEYS, hit):
+                merged[key][idx].append(value)
+    return merged
+
+
+def _by_document(metadatas: list[dict]) -> dict[str, list[int]]:
+    groups: dict[str, list[int]] = defaultdict(list)
+    for row, meta in enumerate(metadatas):
+        groups[meta["document_id"]].append(row)
+    return groups
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+@register_vector_store("chroma")
+class ChromaStore:
+    # Besides the global collection, every document gets its own collection, so a search scoped
+    # to a few documents walks small HNSW graphs instead of post-filtering the whole corpus.
+    def __init__(self, path: str | None = None, partitioned: bool | None = None) -> None:
+        import chromadb
+
+        self._client = chromadb.PersistentClient(path=path or settings.chroma_path)
+        self._collection = self._client.get_or_create_collection(name="documents", metadata=_COSINE)
+        self.partitioned = settings.vector_partitions if partitioned is None else partitioned
+        # Documents with no chunks to partition, valid while the number of collections is unchanged:
+        # any process indexing one of them creates its collection.
+        self._unpartitioned: set[str] = set()
+        self._collection_count = -1
+
+    def _partition_name(self, document_id: str) -> str:
+        return f"doc-{hashlib.sha1(document_id.encode('utf-8')).hexdigest()}"
+
+    def _partition(self, document_id: str):
+        from chromadb.errors import NotFoundError
+
+        if document_id in self._unpartitioned:
+            return None
+        try:
+            return self._client.get_collection(self._partition_name(document_id))
+        except NotFoundError:
+            pass
+        # Documents indexed before partitioning was enabled are copied over on first use.
+        stored = self._collection.get(
+            where={"document_id": document_id}, include=["documents", "metadatas", "embeddings"]
+        )
+        if not stored["ids"]:
+            self._unpartitioned.add(document_id)
+            return None
+        partition = self._client.get_or_create_collection(self._partition_name(document_id), metadata=_COSINE)
+        for start in range(0, len(stored["ids"]), _BACKFILL_BATCH_SIZE):
+            stop = start + _BACKFILL_BATCH_SIZE
+            partition.upsert(
+                ids=stored["ids"][start:stop],
+                documents=stored["documents"][start:stop],
+                embeddings=stored["embeddings"][start:stop],
+                metadatas=stored["metadatas"][start:stop],
+            )
+        return partition
+
+    def upsert(self, ids: list[str], texts: list[str], embeddings: list, metadatas: list[dict]) -> None:
+        self._collection.upsert(ids=ids, documents=texts, embeddings=embeddings, metadatas=metadatas)
+        if not self.partitioned:
+            return
+        for document_id, rows in _by_document(metadatas).items():
+            partition = self._client.get_or_create_collection(self._partition_name(document_id), metadata=_COSINE)
+            partition.upsert(
+                ids=[ids[row] for row in rows],
+                documents=[texts[row] for row in rows],
+                embeddings=[embeddings[row] for row in rows],
+                metadatas=[metadatas[row] for row in rows],
+            )
+
+    def query(self, embeddings: list, n_results: int, document_ids: list[str] | None = None) -> dict:
+        if document_ids == []:
+            return _empty_results(len(embeddings))
+        document_ids = list(dict.fromkeys(document_ids)) if document_ids is not None else None
+        if (
+            document_ids is None
+            or not self.partitioned
+            or len(document_ids) > settings.vector_partition_max_fanout
+        ):
+            where = {"document_id": {"$in": document_ids}} if document_ids is not None else None
+            return self._collection.query(query_embeddings=embeddings, n_results=n_results, where=where)
+
+        collection_count = self._client.count_collections()
+        if collection_count != self._collection_count:
+            self._unpartitioned.clear()
+            self._collection_count = collection_count
+        results = []
+        for document_id in document_ids:
+            partition = self._partition(document_id)
+            if partition is not None:
+                results.append(partition.query(query_embeddings=embeddings, n_results=n_results))
+        return _merge_top_k(results, len(embeddings), n_results)
+
+    def get(self, ids: list[str]) -> dict:
+        return self._collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+
+    def _each_partition(self, metadatas: list[dict]):
+        from chromadb.errors import NotFoundError
+
+        for document_id, rows in _by_document(metadatas).items():
+            try:
+                partition = self._client.get_collection(self._partition_name(document_id))
+            except NotFoundError:
+                continue
+            yield partition, rows
+
+    def update_metadata(self, ids: list[str], metadatas: list[dict]) -> None:
+        self._collection.update(ids=ids, metadatas=metadatas)
+        if self.partitioned:
+            for partition, rows in self._each_partition(metadatas):
+                partition.update(ids=[ids[row] for row in rows], metadatas=[metadatas[row] for row in rows])
+
+    def delete(self, ids: list[str]) -> None:
+        if self.partitioned:
+            stored = self._collection.get(ids=ids, include=["metadatas"])
+            for partition, rows in self._each_partition(stored["metadatas"]):
+                partition.delete(ids=[stored["ids"][row] for row in rows])
+        self._collection.delete(ids=ids)
+
+    def delete_document(self, document_id: str) -> None:
+        from chromadb.errors import NotFoundError
+
+        self._collection.delete(where={"document_id": document_id})
+        try:
+            self._client.delete_collection(self._partition_name(document_id))
+        except NotFoundError:
+            pass
+
+
+class _Snapshot:
+    def __init__(self, version: int, vectors: np.ndarray, ids: np.ndarray, offsets: dict[str, list[int]]) -> None:
+        self.version = version
+        self.vectors = vectors
+        self.ids = ids
+        self.offsets = offsets
+
+
+@register_vector_store("flat")
+class FlatStore:
+    # Chunks live in SQLite; searches run over a read-only snapshot of the vectors, grouped by
+    # document and memory-mapped, which is rewritten on the first search after a change.
+    schema = (
+        "CREATE TABLE IF NOT EXISTS chunks ("
+        "chunk_id TEXT PRIMARY KEY, document_id TEXT NOT NULL, text TEXT NOT NULL, "
+        "metadata TEXT NOT NULL, vector BLOB NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_chunks_document ON chunks (document_id)",
+        "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO state (key, value) VALUES ('version', 0)",
+    )
+
+    def __init__(self, path: str | None = None) -> None:
+        self.root = Path(path or settings.flat_index_path)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "chunks.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.schema:
+            self._conn.execute(statement)
+        self._conn.commit()
+        self._snapshot: _Snapshot | None = None
+
+    def _version(self) -> int:
+        (version,) = self._conn.execute("SELECT value FROM state WHERE key = 'version'").fetchone()
+        return version
+
+    def _changed(self) -> None:
+        self._conn.execute("UPDATE state SET value = value + 1 WHERE key = 'version'")
+        self._conn.commit()
+
+    def _paths(self, version: int) -> tuple[Path, Path, Path]:
+        return (
+            self.root / f"vectors-{version}.npy",
+            self.root / f"ids-{version}.npy",
+            self.root / f"offsets-{version}.json",
+        )
+
+    def _write(self, path: Path, write: Callable) -> None:
+        partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        with partial.open("wb") as handle:
+            write(handle)
+        os.replace(partial, path)
+
+    def _build(self) -> int:
+        # Version and rows are read in one transaction so the snapshot matches the version it is named after.
+        self._conn.execute("BEGIN")
+        try:
+            version = self._version()
+            rows = self._conn.execute("SELECT chunk_id, document_id, vector FROM chunks ORDER BY document_id").fetchall()
+        finally:
+            self._conn.execute("COMMIT")
+
+        dim = len(rows[0][2]) // 4 if rows else 0
+        vectors = np.empty((len(rows), dim), dtype=np.float32)
+        offsets: dict[str, list[int]] = {}
+        for row, (_, document_id, blob) in enumerate(rows):
+            vectors[row] = np.frombuffer(blob, dtype=np.float32)
+            offsets.setdefault(document_id, [row, row])[1] = row + 1
+        ids = np.array([chunk_id for chunk_id, _, _ in rows], dtype=str)
+
+        vectors_path, ids_path, offsets_path = self._paths(version)
+        self._write(vectors_path, lambda handle: np.save(handle, vectors))
+        self._write(ids_path, lambda handle: np.save(handle, ids))
+        # The offset table is written last and marks the snapshot as complete.
+        self._write(offsets_path, lambda handle: handle.write(json.dumps({"count": len(rows), "documents": offsets}).encode()))
+        # Only older snapshots are removed; another process may already have written a newer one.
+        for pattern in ("vectors-*.npy", "ids-*.npy", "offsets-*.json"):
+            for stale in self.root.glob(pattern):
+                stale_version = stale.stem.rsplit("-", 1)[1]
+                if not stale_version.isdigit() or int(stale_version) >= version:
+                    continue
+                try:
+                    stale.unlink()
+                except OSError:
+                    # Still memory-mapped somewhere (Windows refuses to delete it); a later build retries.
+                    pass
+        return version
+
+    def _load(self, version: int) -> _Snapshot:
+        vectors_path, ids_path, offsets_path = self._paths(version)
+        try:
+            table = json.loads(offsets_path.read_text())
+            if not table["count"]:
+                return _Snapshot(version, np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=str), {})
+            return _Snapshot(
+                version,
+                np.load(vectors_path, mmap_mode="r"),
+                np.load(ids_path, mmap_mode="r"),
+                table["documents"],
+            )
+        except FileNotFoundError:
+            return self._load(self._build())
+
+    def _current(self) -> _Snapshot:
+        with self._lock:
+            version = self._version()
+            if self._snapshot is None or self._snapshot.version != version:
+                # Drop the old memory maps first so the rebuild can remove their files.
+                self._snapshot = None
+                self._snapshot = self._load(version)
+            return self._snapshot
+
+    def _fetch(self, ids: list[str], columns: str) -> dict[str, tuple]:
+        found: dict[str, tuple] = {}
+        unique = list(dict.fromkeys(ids))
+        with self._lock:
+            for start in range(0, len(unique), SQLITE_MAX_PARAMS):
+                batch = unique[start:start + SQLITE_MAX_PARAMS]
+                marks = ",".join("?" * len(batch))
+                for chunk_id, *values in self._conn.execute(
+                    f"SELECT chunk_id, {columns} FROM chunks WHERE chunk_id IN ({marks})", batch
+                ):
+                    found[chunk_id] = tuple(values)
+        return found
+
+    def upsert(self, ids: list[str], texts: list[str], embeddings: list, metadatas: list[dict]) -> None:
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        rows = [
+            (chunk_id, meta["document_id"], text, json.dumps(meta), vector.tobytes())
+            for chunk_id, text, meta, vector in zip(ids, texts, metadatas, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, document_id, text, metadata, vector) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._changed()
+
+    def query(self, embeddings: list, n_results: int, document_ids: list[str] | None = None) -> dict:
+        results = _empty_results(len(embeddings))
+        snapshot = self._current()
+        if document_ids is None:
+            ranges = [(0, len(snapshot.ids))]
+        else:
+            ranges = [tuple(snapshot.offsets[doc_id]) for doc_id in dict.fromkeys(document_ids) if doc_id in snapshot.offsets]
+        if not len(snapshot.ids) or not ranges or n_results <= 0:
+            return results
+
+        # Only the offset ranges of the requested documents are read from the mapped file.
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32))
+        rows = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+        scores = np.concatenate([queries @ snapshot.vectors[start:stop].T for start, stop in ranges], axis=1)
+        k = min(n_results, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        ranked = []
+        for idx in range(len(queries)):
+            order = top[idx][np.argsort(-scores[idx, top[idx]])]
+            ranked.append([(str(snapshot.ids[rows[col]]), float(1.0 - scores[idx, col])) for col in order])
+        stored = self._fetch([chunk_id for hits in ranked for chunk_id, _ in hits], "text, metadata")
+        for idx, hits in enumerate(ranked):
+            for chunk_id, distance in hits:
+                if chunk_id not in stored:
+                    continue
+                text, metadata = stored[chunk_id]
+                results["ids"][idx].append(chunk_id)
+                results["documents"][idx].append(text)
+                results["metadatas"][idx].append(json.loads(metadata))
+                results["distances"][idx].append(distance)
+        return results
+
+    def get(self, ids: list[str]) -> dict:
+        stored = self._fetch(ids, "text, metadata, vector")
+        found = [chunk_id for chunk_id in dict.fromkeys(ids) if chunk_id in stored]
+        return {
+            "ids": found,
+            "documents": [stored[chunk_id][0] for chunk_id in found],
+            "metadatas": [json.loads(stored[chunk_id][1]) for chunk_id in found],
+            "embeddings": [np.frombuffer(stored[chunk_id][2], dtype=np.float32) for chunk_id in found],
+        }
+
+    def update_metadata(self, ids: list[str], metadatas: list[dict]) -> None:
+        # Vectors and document ids are unchanged, so the snapshot stays valid.
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chunks SET metadata = ? WHERE chunk_id = ?",
+                [(json.dumps(meta), chunk_id) for chunk_id, meta in zip(ids, metadatas)],
+            )
+            self._conn.commit()
+
+    def delete(self, ids: list[str]) -> None:
+        with self._lock:
+            for start in range(0, len(ids), SQLITE_MAX_PARAMS):
+                batch = ids[start:start + SQLITE_MAX_PARAMS]
+                self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({','.join('?' * len(batch))})", batch)
+            self._changed()
+
+    def delete_document(self, document_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            self._changed()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            if settings.vector_store not in _stores:
+                raise ValueError(f"Unknown vector store: {settings.vector_store}")
+            _store = _stores[settings.vector_store]()
+    return _store
@@ -1,10 +1,13 @@
-from sqlalchemy import create_engine
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from .settings import settings
 
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+_connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
+engine = create_engine(settings.database_url, pool_pre_ping=True, connect_args=_connect_args)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
@@ -18,3 +21,20 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+BASELINE_REVISION = "0001_initial_schema"
+
+
+def upgrade_database() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(Path(__file__).resolve().parent.parent / "alembic.ini"))
+    config.attributes["configure_logger"] = False
+    tables = set(inspect(engine).get_table_names())
+    # Databases created by create_all before migrations existed start from the baseline; the next
+    # revision only adds the tables and columns such a database does not have yet.
+    if "projects" in tables and "alembic_version" not in tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
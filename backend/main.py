@@ -1,18 +1,29 @@
+import asyncio
+import base64
+import binascii
+import json
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 
-from fastapi import BackgroundTasks, Depends, FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+import httpx
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Response, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.orm import Session, load_only, selectinload
 
-from backend.db import Base, SessionLocal, engine, get_db
+from backend.db import SessionLocal, get_db, upgrade_database
 from backend.models import (
     Answer,
     AnswerStatus,
     Document,
     DocumentStatus,
+    Evaluation,
+    Job,
     Project,
     ProjectDocument,
     ProjectScope,
@@ -21,63 +32,78 @@ from backend.models import (
 )
 from backend.schemas import (
     AnswerOut,
+    BulkUploadResponse,
     ChatRequest,
     ChatResponse,
     DocumentOut,
+    EvaluationBatchRequest,
+    EvaluationBatchResponse,
+    EvaluationOut,
+    EvaluationProgress,
     EvaluationRequest,
     EvaluationResponse,
     GenerateResponse,
+    JobOut,
     ProjectCreateResponse,
     ProjectOut,
+    ProjectReviewBundle,
     ProjectUpdate,
     QuestionOut,
     ReviewUpdate,
 )
-from backend.services.evaluation import evaluate_project
-from backend.services.ingestion import process_document
-from backend.services.qa import build_prompt, generate_answers_for_project
-from backend.services.questionnaires import parse_questionnaire_file, parse_questionnaire_text
+from backend.services.context import assemble_context
+from backend.services.evaluation import create_evaluation
+from backend.services.ingestion import stage_uploads
+from backend.services.jobs import enqueue, enqueue_coalesced
+from backend.services.qa import REVIEWED_STATUSES, build_prompt
+from backend.services.questionnaires import create_questions, parse_questionnaire_file, parse_questionnaire_text
 from backend.services.storage import save_upload_file
 from backend.settings import settings
-from ai.llm import generate_answer
-from ai.retriever import query
-
-app = FastAPI(title="Questionnaire Agent")
+from backend.tasks import (
+    BACKFILL_LEXICAL,
+    EVALUATE,
+    GENERATE_ANSWERS,
+    INGEST_BATCH,
+    PROCESS_DOCUMENT,
+    REPLACE_DOCUMENT,
+)
+from backend.worker import start_workers, stop_workers
+from ai.embedding_cache import get_embedding_cache
+from ai.executor import shutdown_executor
+from ai.llm import agenerate_answer, astream_answer
+from ai.llm_cache import get_llm_cache
+from ai.ollama import aclose_clients
+from ai.retriever import aquery
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.auto_migrate:
+        upgrade_database()
+    if settings.lexical_index_enabled:
+        # Cheap when nothing is missing; a worker adds documents indexed before the keyword index.
+        with SessionLocal() as db:
+            enqueue_coalesced(db, BACKFILL_LEXICAL, {})
+    stop_event, workers = start_workers(settings.embedded_workers)
+    yield
+    # Joined off the event loop so shutdown is not held up by a long-running job.
+    await asyncio.to_thread(stop_workers, stop_event, workers, settings.job_shutdown_timeout)
+    await aclose_clients()
+    shutdown_executor()
+
+
+app = FastAPI(title="Questionnaire Agent", lifespan=lifespan)
 
 app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
 
-@app.on_event("startup")
-def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
-
-
 @app.get("/", include_in_schema=False)
 def root() -> FileResponse:
     return FileResponse("frontend/index.html")
 
 
-def _process_document_task(document_id: str) -> None:
-    db = SessionLocal()
-    try:
-        doc = db.get(Document, document_id)
-        if doc:
-            process_document(db, doc)
-    finally:
-        db.close()
-
-
-def _generate_answers_task(project_id: str) -> None:
-    db = SessionLocal()
-    try:
-        generate_answers_for_project(db, project_id)
-    finally:
-        db.close()
-
-
 @app.post("/documents", response_model=DocumentOut)
 def upload_document(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
 ) -> Document:
@@ -92,22 +118,134 @@ def upload_document(
     db.refresh(doc)
 
     dest = Path(settings.storage_path) / f"{doc.id}_{file.filename}"
-    save_upload_file(file, dest)
+    doc.content_hash = save_upload_file(file, dest)
     doc.storage_path = str(dest)
     db.commit()
 
-    background_tasks.add_task(_process_document_task, doc.id)
+    enqueue(db, PROCESS_DOCUMENT, {"document_id": doc.id})
     return doc
 
 
+@app.post("/documents/bulk", response_model=BulkUploadResponse)
+def upload_documents_bulk(
+    files: list[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+) -> BulkUploadResponse:
+    try:
+        documents, duplicates, skipped = stage_uploads(db, files)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    job_id = None
+    if documents:
+        job = enqueue(db, INGEST_BATCH, {"document_ids": [doc.id for doc in documents]})
+        job_id = job.id
+    return BulkUploadResponse(job_id=job_id, documents=documents, duplicates=duplicates, skipped=skipped)
+
+
+@app.put("/documents/{document_id}", response_model=DocumentOut)
+def replace_document(
+    document_id: str,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+) -> Document:
+    doc = db.get(Document, document_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    previous_path = doc.storage_path
+    dest = Path(settings.storage_path) / f"{doc.id}_{file.filename}"
+    doc.content_hash = save_upload_file(file, dest)
+    doc.filename = file.filename
+    doc.content_type = file.content_type or "application/octet-stream"
+    doc.storage_path = str(dest)
+    doc.status = DocumentStatus.UPLOADED
+    db.commit()
+    if previous_path and previous_path != str(dest):
+        Path(previous_path).unlink(missing_ok=True)
+
+    enqueue(db, REPLACE_DOCUMENT, {"document_id": doc.id})
+    return doc
+
+
+PageLimit = Annotated[int | None, Query(ge=1)]
+
+
+def _page_size(limit: int | None) -> int:
+    return min(limit or settings.page_size, settings.page_size_max)
+
+
+def _encode_cursor(*values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def _decode_cursor(cursor: str, *types: type) -> list:
+    # Cursors come back from clients, so a wrong shape or type is a 400 rather than a failed query.
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        decoded = []
+        for value, kind in zip(values, types):
+            if kind is datetime:
+                value = datetime.fromisoformat(value)
+            elif type(value) is not kind:
+                raise ValueError(cursor)
+            decoded.append(value)
+        return decoded
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _field_names(fields: str | None, schema: type[BaseModel]) -> list[str] | None:
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(schema.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id", *dict.fromkeys(name for name in names if name != "id")]
+
+
+def _page(response: Response, items: list, names: list[str] | None, next_cursor: str | None):
+    # The next page is advertised in a header so list responses keep their shape.
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if names is None:
+        response.headers.update(headers)
+        return items
+    content = [{name: getattr(item, name) for name in names} for item in items]
+    return JSONResponse(jsonable_encoder(content), headers=headers)
+
+
+def _list_recent(db: Session, model, response: Response, limit: int | None, after: str | None, names: list[str] | None):
+    size = _page_size(limit)
+    stmt = select(model).order_by(model.created_at.desc(), model.id.desc()).limit(size + 1)
+    if after:
+        created_at, item_id = _decode_cursor(after, datetime, str)
+        stmt = stmt.where(tuple_(model.created_at, model.id) < (created_at, item_id))
+    if names is not None:
+        stmt = stmt.options(load_only(*(getattr(model, name) for name in names), model.created_at))
+    items = db.scalars(stmt).all()
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = _encode_cursor(items[-1].created_at.isoformat(), items[-1].id)
+    return _page(response, items, names, next_cursor)
+
+
 @app.get("/documents", response_model=list[DocumentOut])
-def list_documents(db: Session = Depends(get_db)) -> list[Document]:
-    return db.query(Document).order_by(Document.created_at.desc()).all()
+def list_documents(
+    response: Response,
+    limit: PageLimit = None,
+    after: str | None = None,
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+):
+    return _list_recent(db, Document, response, limit, after, _field_names(fields, DocumentOut))
 
 
 @app.post("/projects", response_model=ProjectCreateResponse)
 def create_project(
-    background_tasks: BackgroundTasks,
     name: Annotated[str, Form(...)],
     scope: Annotated[ProjectScope, Form(...)] = ProjectScope.ALL_DOCS,
     description: Annotated[str | None, Form()] = None,
@@ -123,9 +261,13 @@ def create_project(
     db.refresh(project)
 
     if scope == ProjectScope.SELECTED_DOCS and document_ids:
-        for doc_id in [d.strip() for d in document_ids.split(",") if d.strip()]:
-            db.add(ProjectDocument(project_id=project.id, document_id=doc_id))
-        db.commit()
+        doc_ids = dict.fromkeys(d.strip() for d in document_ids.split(",") if d.strip())
+        if doc_ids:
+            db.execute(
+                insert(ProjectDocument),
+                [{"project_id": project.id, "document_id": doc_id} for doc_id in doc_ids],
+            )
+            db.commit()
 
     cleaned_text = (questionnaire_text or "").strip()
     if cleaned_text:
@@ -134,32 +276,25 @@ def create_project(
         parsed_questions = parse_questionnaire_file(questionnaire)
     else:
         raise HTTPException(status_code=400, detail="Questionnaire text is required.")
-    questions_created = 0
-    for q in parsed_questions:
-        question = Question(
-            project_id=project.id,
-            section=q["section"],
-            order_index=q["order_index"],
-            text=q["text"],
-        )
-        db.add(question)
-        db.flush()
-        db.add(Answer(question_id=question.id, status=AnswerStatus.PENDING))
-        questions_created += 1
-    db.commit()
-
+    questions_created = create_questions(db, project.id, parsed_questions)
     project.status = ProjectStatus.READY
     db.commit()
 
     if auto_generate:
-        background_tasks.add_task(_generate_answers_task, project.id)
+        enqueue(db, GENERATE_ANSWERS, {"project_id": project.id})
 
     return ProjectCreateResponse(project=project, questions_created=questions_created)
 
 
 @app.get("/projects", response_model=list[ProjectOut])
-def list_projects(db: Session = Depends(get_db)) -> list[Project]:
-    return db.query(Project).order_by(Project.created_at.desc()).all()
+def list_projects(
+    response: Response,
+    limit: PageLimit = None,
+    after: str | None = None,
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+):
+    return _list_recent(db, Project, response, limit, after, _field_names(fields, ProjectOut))
 
 
 @app.get("/projects/{project_id}", response_model=ProjectOut)
@@ -174,7 +309,6 @@ def get_project(project_id: str, db: Session = Depends(get_db)) -> Project:
 def update_project(
     project_id: str,
     payload: ProjectUpdate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ) -> Project:
     project = db.get(Project, project_id)
@@ -189,18 +323,28 @@ def update_project(
 
     if payload.document_ids is not None:
         db.query(ProjectDocument).filter(ProjectDocument.project_id == project_id).delete()
-        for doc_id in payload.document_ids:
-            db.add(ProjectDocument(project_id=project_id, document_id=doc_id))
+        doc_ids = dict.fromkeys(payload.document_ids)
+        if doc_ids:
+            db.execute(
+                insert(ProjectDocument),
+                [{"project_id": project_id, "document_id": doc_id} for doc_id in doc_ids],
+            )
 
     project.status = ProjectStatus.OUTDATED
-    for question in project.questions:
-        for answer in question.answers:
-            answer.status = AnswerStatus.STALE
-
+    db.execute(
+        update(Answer)
+        .where(
+            Answer.question_id == Question.id,
+            Question.project_id == project_id,
+            Answer.status.not_in([*REVIEWED_STATUSES, AnswerStatus.STALE]),
+        )
+        .values(status=AnswerStatus.STALE),
+        execution_options={"synchronize_session": False},
+    )
     db.commit()
 
     if payload.auto_regenerate:
-        background_tasks.add_task(_generate_answers_task, project.id)
+        enqueue(db, GENERATE_ANSWERS, {"project_id": project.id, "only_changed": True})
 
     return project
 
@@ -208,7 +352,8 @@ def update_project(
 @app.post("/projects/{project_id}/generate", response_model=GenerateResponse)
 def generate_project_answers(
     project_id: str,
-    background_tasks: BackgroundTasks,
+    only_changed: bool = False,
+    use_cache: bool = True,
     db: Session = Depends(get_db),
 ) -> GenerateResponse:
     project = db.get(Project, project_id)
@@ -217,27 +362,103 @@ def generate_project_answers(
 
     project.status = ProjectStatus.GENERATING
     db.commit()
-    background_tasks.add_task(_generate_answers_task, project.id)
-    return GenerateResponse(project_id=project.id, status=project.status)
+    job = enqueue(
+        db,
+        GENERATE_ANSWERS,
+        {"project_id": project.id, "only_changed": only_changed, "use_cache": use_cache},
+    )
+    return GenerateResponse(project_id=project.id, status=project.status, job_id=job.id)
+
+
+@app.get("/jobs/{job_id}", response_model=JobOut)
+def get_job(job_id: str, db: Session = Depends(get_db)) -> Job:
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @app.get("/projects/{project_id}/questions", response_model=list[QuestionOut])
-def list_questions(project_id: str, db: Session = Depends(get_db)) -> list:
-    project = db.get(Project, project_id)
-    if project is None:
+def list_questions(
+    project_id: str,
+    response: Response,
+    limit: PageLimit = None,
+    after: str | None = None,
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+):
+    if db.get(Project, project_id) is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    return project.questions
+    names = _field_names(fields, QuestionOut)
+    size = _page_size(limit)
+    stmt = (
+        select(Question)
+        .where(Question.project_id == project_id)
+        .order_by(Question.order_index, Question.id)
+        .limit(size + 1)
+    )
+    if after:
+        order_index, question_id = _decode_cursor(after, int, str)
+        stmt = stmt.where(tuple_(Question.order_index, Question.id) > (order_index, question_id))
+    if names is not None:
+        stmt = stmt.options(load_only(*(getattr(Question, name) for name in names), Question.order_index))
+    questions = db.scalars(stmt).all()
+    next_cursor = None
+    if len(questions) > size:
+        questions = questions[:size]
+        next_cursor = _encode_cursor(questions[-1].order_index, questions[-1].id)
+    return _page(response, questions, names, next_cursor)
 
 
 @app.get("/projects/{project_id}/answers", response_model=list[AnswerOut])
-def list_answers(project_id: str, db: Session = Depends(get_db)) -> list:
+def list_answers(
+    project_id: str,
+    response: Response,
+    limit: PageLimit = None,
+    after: str | None = None,
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+):
+    if db.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    names = _field_names(fields, AnswerOut)
+    size = _page_size(limit)
+    stmt = (
+        select(Answer, Question.order_index)
+        .join(Question, Answer.question_id == Question.id)
+        .where(Question.project_id == project_id)
+        .order_by(Question.order_index, Answer.id)
+        .limit(size + 1)
+    )
+    if after:
+        order_index, answer_id = _decode_cursor(after, int, str)
+        stmt = stmt.where(tuple_(Question.order_index, Answer.id) > (order_index, answer_id))
+    if names is not None:
+        stmt = stmt.options(load_only(*(getattr(Answer, name) for name in names)))
+    rows = db.execute(stmt).all()
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = _encode_cursor(rows[-1][1], rows[-1][0].id)
+    return _page(response, [answer for answer, _ in rows], names, next_cursor)
+
+
+@app.get("/projects/{project_id}/review", response_model=ProjectReviewBundle)
+def get_project_review(project_id: str, db: Session = Depends(get_db)) -> ProjectReviewBundle:
     project = db.get(Project, project_id)
     if project is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    answers = []
-    for question in project.questions:
-        answers.extend(question.answers)
-    return answers
+    questions = db.scalars(
+        select(Question)
+        .where(Question.project_id == project_id)
+        .options(selectinload(Question.answers))
+        .order_by(Question.order_index, Question.id)
+    ).all()
+    return ProjectReviewBundle(
+        project=project,
+        questions=questions,
+        answers=[answer for question in questions for answer in question.answers],
+    )
 
 
 @app.patch("/answers/{answer_id}/review", response_model=AnswerOut)
@@ -257,40 +478,118 @@ def review_answer(answer_id: str, payload: ReviewUpdate, db: Session = Depends(g
 
 @app.post("/projects/{project_id}/evaluate", response_model=EvaluationResponse)
 def evaluate(project_id: str, payload: EvaluationRequest, db: Session = Depends(get_db)) -> EvaluationResponse:
-    evaluation = evaluate_project(db, project_id, payload.ground_truth)
+    try:
+        evaluation = create_evaluation(db, project_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    enqueue(db, EVALUATE, {"items": [{"evaluation_id": evaluation.id, "ground_truth": payload.ground_truth}]})
     return EvaluationResponse(evaluation=evaluation)
 
 
-@app.post("/chat", response_model=ChatResponse)
-def chat(payload: ChatRequest) -> ChatResponse:
-    results = query(payload.query, settings.top_k)
+@app.post("/evaluations", response_model=EvaluationBatchResponse)
+def evaluate_batch(payload: EvaluationBatchRequest, db: Session = Depends(get_db)) -> EvaluationBatchResponse:
+    try:
+        evaluations = [create_evaluation(db, item.project_id) for item in payload.items]
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    items = [
+        {"evaluation_id": evaluation.id, "ground_truth": item.ground_truth}
+        for evaluation, item in zip(evaluations, payload.items)
+    ]
+    enqueue(db, EVALUATE, {"items": items})
+    return EvaluationBatchResponse(evaluations=evaluations)
+
+
+@app.get("/evaluations/{evaluation_id}", response_model=EvaluationOut)
+def get_evaluation(evaluation_id: str, db: Session = Depends(get_db)) -> Evaluation:
+    evaluation = db.get(Evaluation, evaluation_id)
+    if evaluation is None:
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+    return evaluation
+
+
+@app.get("/evaluations/{evaluation_id}/progress", response_model=EvaluationProgress)
+def get_evaluation_progress(evaluation_id: str, db: Session = Depends(get_db)) -> EvaluationProgress:
+    evaluation = db.get(Evaluation, evaluation_id)
+    if evaluation is None:
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+    progress = (evaluation.metrics or {}).get("progress") or {}
+    return EvaluationProgress(
+        id=evaluation.id,
+        status=evaluation.status,
+        completed=progress.get("completed", 0),
+        total=progress.get("total"),
+    )
+
+
+async def _chat_context(question: str) -> tuple[list[str], float, list[dict]]:
+    results = await aquery(question, settings.top_k)
     documents = results.get("documents", [[]])[0]
     metadatas = results.get("metadatas", [[]])[0]
     distances = results.get("distances", [[]])[0]
 
     if not documents:
-        return ChatResponse(answer_text="No relevant documents found.", answerable=False, confidence=0.0, citations=[])
+        return [], 0.0, []
 
     confidence = sum(max(0.0, 1.0 - d) for d in distances) / max(1, len(distances))
-    citations = []
-    for meta, dist, text in zip(metadatas, distances, documents):
-        citations.append({
-            "chunk_id": meta.get("chunk_id"),
-            "document_id": meta.get("document_id"),
-            "page": meta.get("page"),
-            "bbox": meta.get("bbox"),
-            "similarity": round(max(0.0, 1.0 - dist), 3),
-            "text_snippet": text[:240],
-        })
+    passages, citations = assemble_context(documents, metadatas, distances)
+    return passages, round(confidence, 3), citations
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(payload: ChatRequest) -> ChatResponse:
+    documents, confidence, citations = await _chat_context(payload.query)
+    if not documents:
+        return ChatResponse(answer_text="No relevant documents found.", answerable=False, confidence=0.0, citations=[])
 
     prompt = build_prompt(payload.query, documents)
-    answer_text = generate_answer(prompt)
+    answer_text = await agenerate_answer(prompt, use_cache=payload.use_cache)
 
     return ChatResponse(
         answer_text=answer_text,
         answerable=True,
-        confidence=round(confidence, 3),
+        confidence=confidence,
         citations=citations,
     )
 
 
+@app.post("/chat/stream")
+async def chat_stream(payload: ChatRequest) -> StreamingResponse:
+    documents, confidence, citations = await _chat_context(payload.query)
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("citations", {"answerable": bool(documents), "confidence": confidence, "citations": citations})
+        if not documents:
+            yield _sse("token", {"text": "No relevant documents found."})
+            yield _sse("done", {"answer_text": "No relevant documents found."})
+            return
+
+        parts: list[str] = []
+        try:
+            async for token in astream_answer(build_prompt(payload.query, documents), use_cache=payload.use_cache):
+                parts.append(token)
+                yield _sse("token", {"text": token})
+        except httpx.HTTPError as exc:
+            yield _sse("error", {"detail": str(exc)})
+            return
+        yield _sse("done", {"answer_text": "".join(parts).strip()})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/cache/stats")
+def cache_stats() -> dict:
+    embedding_cache = get_embedding_cache()
+    llm_cache = get_llm_cache()
+    return {
+        "embeddings": embedding_cache.stats() if embedding_cache else None,
+        "llm": llm_cache.stats() if llm_cache else None,
+    }
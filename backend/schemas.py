@@ -4,7 +4,7 @@ from typing import Any
 from pydantic import BaseModel, Field
 from pydantic.config import ConfigDict
 
-from .models import AnswerStatus, DocumentStatus, EvaluationStatus, ProjectScope, ProjectStatus
+from .models import AnswerStatus, DocumentStatus, EvaluationStatus, JobStatus, ProjectScope, ProjectStatus
 
 
 class ORMModel(BaseModel):
@@ -16,9 +16,28 @@ class DocumentOut(ORMModel):
     filename: str
     content_type: str
     status: DocumentStatus
+    indexed_chunks: int
+    content_hash: str | None
     created_at: datetime
 
 
+class DuplicateUpload(BaseModel):
+    filename: str
+    document_id: str
+
+
+class SkippedUpload(BaseModel):
+    filename: str
+    reason: str
+
+
+class BulkUploadResponse(BaseModel):
+    job_id: str | None = None
+    documents: list[DocumentOut]
+    duplicates: list[DuplicateUpload]
+    skipped: list[SkippedUpload]
+
+
 class ProjectOut(ORMModel):
     id: str
     name: str
@@ -46,6 +65,7 @@ class AnswerOut(ORMModel):
     ai_answerable: bool | None
     ai_confidence: float | None
     ai_citations: list | None
+    context_chunk_ids: list | None
     manual_answer_text: str | None
     manual_answerable: bool | None
     manual_updated_at: datetime | None
@@ -60,6 +80,12 @@ class EvaluationOut(ORMModel):
     created_at: datetime
 
 
+class ProjectReviewBundle(BaseModel):
+    project: ProjectOut
+    questions: list[QuestionOut]
+    answers: list[AnswerOut]
+
+
 class ReviewUpdate(BaseModel):
     status: AnswerStatus
     manual_answer_text: str | None = None
@@ -74,6 +100,20 @@ class ProjectCreateResponse(BaseModel):
 class GenerateResponse(BaseModel):
     project_id: str
     status: ProjectStatus
+    job_id: str | None = None
+
+
+class JobOut(ORMModel):
+    id: str
+    kind: str
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    progress: float
+    detail: str | None
+    error: str | None
+    created_at: datetime
+    updated_at: datetime
 
 
 class ProjectUpdate(BaseModel):
@@ -91,8 +131,29 @@ class EvaluationResponse(BaseModel):
     evaluation: EvaluationOut
 
 
+class EvaluationProgress(BaseModel):
+    id: str
+    status: EvaluationStatus
+    completed: int
+    total: int | None
+
+
+class EvaluationBatchItem(BaseModel):
+    project_id: str
+    ground_truth: list[dict] = Field(..., description="List of {question_id, answer_text}")
+
+
+class EvaluationBatchRequest(BaseModel):
+    items: list[EvaluationBatchItem]
+
+
+class EvaluationBatchResponse(BaseModel):
+    evaluations: list[EvaluationOut]
+
+
 class ChatRequest(BaseModel):
     query: str
+    use_cache: bool = True
 
 
 class ChatResponse(BaseModel):
@@ -0,0 +1,197 @@
+import re
+from typing import Callable, Iterable, Iterator
+
+from backend.services.context import CHARS_PER_TOKEN, estimate_tokens
+from backend.settings import settings
+
+
+Chunker = Callable[[Iterable[dict]], Iterator[dict]]
+
+_chunkers: dict[str, Chunker] = {}
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+
+
+def register_chunker(name: str) -> Callable[[Chunker], Chunker]:
+    def decorator(chunker: Chunker) -> Chunker:
+        _chunkers[name] = chunker
+        return chunker
+    return decorator
+
+
+def get_chunker(name: str | None = None) -> Chunker:
+    name = name or settings.chunker
+    if name not in _chunkers:
+        raise ValueError(f"Unknown chunker: {name}")
+    return _chunkers[name]
+
+
+def iter_chunks(pages: Iterable[dict], name: str | None = None) -> Iterator[dict]:
+    return get_chunker(name)(pages)
+
+
+@register_chunker("fixed")
+def fixed_chunks(pages: Iterable[dict]) -> Iterator[dict]:
+    chunk_size = settings.chunk_size
+    overlap = settings.chunk_overlap
+    for page in pages:
+        text = page["text"] or ""
+        if not text.strip():
+            continue
+        start = 0
+        while start < len(text):
+            end = min(start + chunk_size, len(text))
+            chunk_text = text[start:end]
+            if chunk_text.strip():
+                yield {
+                    "text": chunk_text,
+                    "page": page["page"],
+                    "bbox": page["bbox"],
+                }
+            if end == len(text):
+                break
+            start = end - overlap
+
+
+def _split_long(text: str, max_tokens: int) -> Iterator[str]:
+    limit = max_tokens * CHARS_PER_TOKEN
+    while len(text) > limit:
+        cut = text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        yield text[:cut].rstrip()
+        text = text[cut:].lstrip()
+    if text:
+        yield text
+
+
+def _units(text: str, max_tokens: int) -> Iterator[tuple[str, bool]]:
+    # Yields (sentence, starts_paragraph); sentences longer than a chunk are split on whitespace.
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = " ".join(paragraph.split())
+        first = True
+        for sentence in _SENTENCE_RE.split(paragraph):
+            for piece in _split_long(sentence, max_tokens):
+                yield piece, first
+                first = False
+
+
+class _Unit:
+    def __init__(self, text: str, separator: str, page, bbox) -> None:
+        self.text = text
+        self.separator = separator
+        self.page = page
+        self.bbox = bbox
+        self.tokens = estimate_tokens(text)
+
+
+class _Buffer:
+    def __init__(self) -> None:
+        self.units: list[_Unit] = []
+        self.tokens = 0
+        self.carried = 0
+
+    def add(self, unit: _Unit) -> None:
+        self.units.append(unit)
+        self.tokens += unit.tokens
+
+    def chunk(self) -> dict:
+        return {
+            "text": self.units[0].text + "".join(unit.separator + unit.text for unit in self.units[1:]),
+            "page": self.units[0].page,
+            "bbox": self.units[0].bbox,
+        }
+
+    def fresh_text(self) -> str:
+        return "".join(unit.separator + unit.text for unit in self.units[self.carried:])
+
+    def carry(self, overlap_tokens: int) -> "_Buffer":
+        carried = _Buffer()
+        tokens = 0
+        kept: list[_Unit] = []
+        for unit in reversed(self.units[1:]):
+            if tokens + unit.tokens > overlap_tokens:
+                break
+            tokens += unit.tokens
+            kept.append(unit)
+        for unit in reversed(kept):
+            carried.add(_Unit(unit.text, unit.separator, unit.page, unit.bbox))
+        carried.carried = len(kept)
+        return carried
+
+
+def _table_chunks(page: dict, max_tokens: int) -> Iterator[dict]:
+    # Rows are never split, and every chunk repeats the sheet title and header row.
+    rows = [row for row in (page["text"] or "").split("\n") if row.strip()]
+    if not rows:
+        return
+    header = rows[0]
+    if page.get("title"):
+        header = f"{page['title']}\n{header}"
+    if len(rows) == 1:
+        # A header-only sheet is emitted once rather than repeated under itself.
+        yield {"text": header, "page": page["page"], "bbox": page["bbox"]}
+        return
+    budget = max(1, max_tokens - estimate_tokens(header))
+    batch: list[str] = []
+    tokens = 0
+    for row in rows[1:]:
+        row_tokens = estimate_tokens(row)
+        if batch and tokens + row_tokens > budget:
+            yield {"text": "\n".join([header, *batch]), "page": page["page"], "bbox": page["bbox"]}
+            batch, tokens = [], 0
+        batch.append(row)
+        tokens += row_tokens
+    if batch:
+        yield {"text": "\n".join([header, *batch]), "page": page["page"], "bbox": page["bbox"]}
+
+
+@register_chunker("structured")
+def structured_chunks(pages: Iterable[dict]) -> Iterator[dict]:
+    max_tokens = max(1, settings.chunk_tokens)
+    overlap_tokens = max(0, settings.chunk_overlap_tokens)
+    min_tokens = max(0, settings.chunk_min_tokens)
+
+    # The last prose chunk is held back so a short tail can be folded into it.
+    held: dict | None = None
+    held_tokens = 0
+
+    def release() -> Iterator[dict]:
+        nonlocal held
+        if held is not None:
+            yield held
+            held = None
+
+    buffer = _Buffer()
+    for page in pages:
+        if page.get("kind") == "table":
+            yield from release()
+            if buffer.units:
+                yield buffer.chunk()
+                buffer = _Buffer()
+            yield from _table_chunks(page, max_tokens)
+            continue
+
+        # Page breaks behave like paragraph breaks, so prose flows across pages.
+        for text, starts_paragraph in _units(page["text"] or "", max_tokens):
+            unit = _Unit(text, "\n\n" if starts_paragraph else " ", page["page"], page["bbox"])
+            if buffer.tokens + unit.tokens <= max_tokens:
+                buffer.add(unit)
+                continue
+            yield from release()
+            held, held_tokens = buffer.chunk(), buffer.tokens
+            # Breaking mid-paragraph repeats the last sentences so no statement loses its lead-in.
+            buffer = _Buffer() if starts_paragraph else buffer.carry(overlap_tokens)
+            if buffer.tokens + unit.tokens > max_tokens:
+                buffer = _Buffer()
+            buffer.add(unit)
+
+    if buffer.units:
+        fresh = buffer.tokens - sum(unit.tokens for unit in buffer.units[:buffer.carried])
+        if held is not None and fresh < min_tokens and held_tokens + fresh <= max_tokens + min_tokens:
+            held = {**held, "text": held["text"] + buffer.fresh_text()}
+        else:
+            yield from release()
+            held = buffer.chunk()
+    yield from release()
@@ -0,0 +1,139 @@
+import re
+
+from backend.settings import settings
+
+
+CHARS_PER_TOKEN = 4
+_WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def _overlap(left: str, right: str, limit: int) -> int:
+    for size in range(min(len(left), len(right), limit), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _shingles(text: str, size: int = 3) -> frozenset:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def _containment(candidate: frozenset, kept: frozenset) -> float:
+    if not candidate or not kept:
+        return 0.0
+    return len(candidate & kept) / len(candidate)
+
+
+class _Span:
+    def __init__(self, rank: int, text: str, meta: dict, distance: float) -> None:
+        self.rank = rank
+        self.text = text
+        self.meta = meta
+        self.distance = distance
+        self.start = 0
+        self.end = len(text)
+
+
+class _Passage:
+    def __init__(self, span: _Span) -> None:
+        self.spans = [span]
+
+    @property
+    def rank(self) -> int:
+        return min(span.rank for span in self.spans)
+
+    @property
+    def text(self) -> str:
+        return "".join(span.text[span.start:span.end] for span in self.spans)
+
+    def truncate(self, chars: int) -> None:
+        kept = []
+        for span in self.spans:
+            if chars <= 0:
+                break
+            span.end = min(span.end, span.start + chars)
+            chars -= span.end - span.start
+            kept.append(span)
+        self.spans = kept
+
+
+def _merge_adjacent(spans: list[_Span]) -> list[_Passage]:
+    by_document: dict[str | None, list[_Span]] = {}
+    for span in spans:
+        by_document.setdefault(span.meta.get("document_id"), []).append(span)
+
+    passages: list[_Passage] = []
+    limit = max(1, settings.chunk_overlap, settings.chunk_overlap_tokens * CHARS_PER_TOKEN) * 2
+    for members in by_document.values():
+        members.sort(key=lambda span: (span.meta.get("chunk_index") is None, span.meta.get("chunk_index") or 0))
+        current: _Passage | None = None
+        previous_index = None
+        for span in members:
+            chunk_index = span.meta.get("chunk_index")
+            shared = 0
+            if current is not None and chunk_index is not None and previous_index == chunk_index - 1:
+                shared = _overlap(current.text, span.text, limit)
+            if shared:
+                span.start = shared
+                current.spans.append(span)
+            else:
+                current = _Passage(span)
+                passages.append(current)
+            previous_index = chunk_index
+    return passages
+
+
+def assemble_context(
+    documents: list[str],
+    metadatas: list[dict],
+    distances: list[float],
+    token_budget: int | None = None,
+) -> tuple[list[str], list[dict]]:
+    budget = token_budget if token_budget is not None else settings.context_token_budget
+    spans = [
+        _Span(rank, text or "", meta or {}, dist)
+        for rank, (text, meta, dist) in enumerate(zip(documents, metadatas, distances))
+    ]
+    passages = sorted(_merge_adjacent(spans), key=lambda passage: passage.rank)
+
+    # Passages are packed best-first; near-duplicates of an already packed passage are skipped.
+    kept: list[_Passage] = []
+    seen: list[frozenset] = []
+    used = 0
+    for passage in passages:
+        shingles = _shingles(passage.text)
+        if any(_containment(shingles, other) >= settings.context_dedupe_threshold for other in seen):
+            continue
+        tokens = estimate_tokens(passage.text)
+        if budget > 0 and used + tokens > budget:
+            remaining = budget - used
+            if remaining < settings.context_min_passage_tokens:
+                break
+            passage.truncate(remaining * CHARS_PER_TOKEN)
+            tokens = remaining
+        kept.append(passage)
+        seen.append(shingles)
+        used += tokens
+
+    # Citations point at the part of each chunk the model actually saw.
+    citations = [
+        {
+            "chunk_id": span.meta.get("chunk_id"),
+            "document_id": span.meta.get("document_id"),
+            "page": span.meta.get("page"),
+            "bbox": span.meta.get("bbox"),
+            "similarity": round(max(0.0, 1.0 - span.distance), 3),
+            "span": [span.start, span.end],
+            "text_snippet": span.text[span.start:span.end][:240],
+        }
+        for passage in kept
+        for span in passage.spans
+    ]
+    return [passage.text for passage in kept], citations
@@ -1,25 +1,26 @@
-import math
 import re
-from statistics import mean
+from functools import lru_cache
+from typing import Callable
 
+import numpy as np
 from sqlalchemy.orm import Session
 
 from ai.embeddings import embed_texts
 from backend.models import Answer, Evaluation, EvaluationStatus, Project, ProjectStatus
+from backend.settings import settings
 
 
-def _cosine_similarity(vec1: list[float], vec2: list[float]) -> float:
-    dot = sum(a * b for a, b in zip(vec1, vec2))
-    norm1 = math.sqrt(sum(a * a for a in vec1))
-    norm2 = math.sqrt(sum(b * b for b in vec2))
-    if norm1 == 0 or norm2 == 0:
-        return 0.0
-    return dot / (norm1 * norm2)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=16384)
+def _tokens(text: str) -> frozenset[str]:
+    return frozenset(_TOKEN_RE.findall(text.lower()))
 
 
 def _keyword_overlap(a: str, b: str) -> float:
-    tokens_a = set(re.findall(r"[a-z0-9]+", a.lower()))
-    tokens_b = set(re.findall(r"[a-z0-9]+", b.lower()))
+    tokens_a = _tokens(a)
+    tokens_b = _tokens(b)
     if not tokens_a and not tokens_b:
         return 1.0
     if not tokens_a or not tokens_b:
@@ -27,59 +28,131 @@ def _keyword_overlap(a: str, b: str) -> float:
     return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
 
 
-def evaluate_project(db: Session, project_id: str, ground_truth: list[dict]) -> Evaluation:
+def _cosine_similarities(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    dots = np.einsum("ij,ij->i", left, right)
+    norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+
+def _collect_pairs(project: Project, ground_truth: list[dict]) -> list[tuple[str, str, str]]:
+    gt_map = {item["question_id"]: item["answer_text"] for item in ground_truth}
+    pairs = []
+    for question in sorted(project.questions, key=lambda q: q.order_index):
+        answer: Answer | None = question.answers[0] if question.answers else None
+        ai_text = (answer.ai_answer_text or "") if answer else ""
+        pairs.append((question.id, ai_text, gt_map.get(question.id, "")))
+    return pairs
+
+
+def _embed_unique(texts: list[str]) -> dict[str, np.ndarray]:
+    unique = list(dict.fromkeys(texts))
+    if not unique:
+        return {}
+    matrix = np.asarray(embed_texts(unique), dtype=np.float32)
+    return dict(zip(unique, matrix))
+
+
+def _score_pairs(pairs: list[tuple[str, str, str]]) -> tuple[np.ndarray, np.ndarray]:
+    vectors = _embed_unique([text for _, ai_text, human_text in pairs for text in (ai_text, human_text)])
+    left = np.stack([vectors[ai_text] for _, ai_text, _ in pairs])
+    right = np.stack([vectors[human_text] for _, _, human_text in pairs])
+    semantic = _cosine_similarities(left, right)
+    keyword = np.array([_keyword_overlap(ai_text, human_text) for _, ai_text, human_text in pairs])
+    return semantic, keyword
+
+
+class _Run:
+    def __init__(self, evaluation: Evaluation, pairs: list[tuple[str, str, str]]) -> None:
+        self.evaluation = evaluation
+        self.pairs = pairs
+        self.per_question: list[dict] = []
+        self.semantic: list[float] = []
+        self.keyword: list[float] = []
+
+    def add(self, pair: tuple[str, str, str], sem_sim: float, key_sim: float) -> None:
+        question_id, ai_text, human_text = pair
+        self.semantic.append(sem_sim)
+        self.keyword.append(key_sim)
+        self.per_question.append({
+            "question_id": question_id,
+            "semantic_similarity": round(sem_sim, 3),
+            "keyword_overlap": round(key_sim, 3),
+            "score": round(0.7 * sem_sim + 0.3 * key_sim, 3),
+            "ai_answer": ai_text,
+            "human_answer": human_text,
+        })
+
+    def metrics(self) -> dict:
+        scores = [q["score"] for q in self.per_question]
+        return {
+            "per_question": list(self.per_question),
+            "aggregate": {
+                "semantic_similarity_avg": round(float(np.mean(self.semantic)), 3) if self.semantic else 0.0,
+                "keyword_overlap_avg": round(float(np.mean(self.keyword)), 3) if self.keyword else 0.0,
+                "overall_score": round(float(np.mean(scores)), 3) if scores else 0.0,
+            },
+            "progress": {"completed": len(self.per_question), "total": len(self.pairs)},
+        }
+
+
+def create_evaluation(db: Session, project_id: str) -> Evaluation:
     project = db.get(Project, project_id)
     if project is None:
         raise ValueError("Project not found")
 
-    project.status = ProjectStatus.EVALUATING
-    db.commit()
-
-    evaluation = Evaluation(project_id=project_id, status=EvaluationStatus.PENDING)
+    evaluation = Evaluation(
+        project_id=project_id,
+        status=EvaluationStatus.PENDING,
+        metrics={"per_question": [], "aggregate": None, "progress": {"completed": 0, "total": None}},
+    )
     db.add(evaluation)
     db.commit()
     db.refresh(evaluation)
+    return evaluation
 
-    gt_map = {item["question_id"]: item["answer_text"] for item in ground_truth}
 
-    per_question = []
-    semantic_scores = []
-    keyword_scores = []
+def run_evaluations(
+    db: Session,
+    items: list[tuple[Evaluation, list[dict]]],
+    on_progress: Callable[[float | None, str], None] | None = None,
+) -> None:
+    runs = []
+    for evaluation, ground_truth in items:
+        project = db.get(Project, evaluation.project_id)
+        project.status = ProjectStatus.EVALUATING
+        evaluation.status = EvaluationStatus.RUNNING
+        runs.append(_Run(evaluation, _collect_pairs(project, ground_truth)))
+    for run in runs:
+        run.evaluation.metrics = run.metrics()
+    db.commit()
 
-    for question in project.questions:
-        answer: Answer | None = question.answers[0] if question.answers else None
-        ai_text = (answer.ai_answer_text or "") if answer else ""
-        human_text = gt_map.get(question.id, "")
+    # Pairs from every run share each embedding batch; metrics are flushed after every batch.
+    pending = [(run, pair) for run in runs for pair in run.pairs]
+    batch_size = max(1, settings.evaluation_batch_size)
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        semantic, keyword = _score_pairs([pair for _, pair in batch])
+        for (run, pair), sem_sim, key_sim in zip(batch, semantic, keyword):
+            run.add(pair, float(sem_sim), float(key_sim))
+        for run in {id(run): run for run, _ in batch}.values():
+            run.evaluation.metrics = run.metrics()
+        db.commit()
+        done = start + len(batch)
+        if on_progress is not None:
+            on_progress(done / len(pending), f"{done}/{len(pending)} answers scored")
+
+    for run in runs:
+        run.evaluation.metrics = run.metrics()
+        run.evaluation.status = EvaluationStatus.COMPLETED
+        db.get(Project, run.evaluation.project_id).status = ProjectStatus.EVALUATED
+    db.commit()
 
-        embeddings = embed_texts([ai_text, human_text])
-        sem_sim = _cosine_similarity(embeddings[0], embeddings[1])
-        key_sim = _keyword_overlap(ai_text, human_text)
-        score = round(0.7 * sem_sim + 0.3 * key_sim, 3)
 
-        per_question.append({
-            "question_id": question.id,
-            "semantic_similarity": round(sem_sim, 3),
-            "keyword_overlap": round(key_sim, 3),
-            "score": score,
-            "ai_answer": ai_text,
-            "human_answer": human_text,
-        })
+def evaluate_projects(db: Session, requests: list[tuple[str, list[dict]]]) -> list[Evaluation]:
+    evaluations = [create_evaluation(db, project_id) for project_id, _ in requests]
+    run_evaluations(db, [(evaluation, ground_truth) for evaluation, (_, ground_truth) in zip(evaluations, requests)])
+    return evaluations
 
-        semantic_scores.append(sem_sim)
-        keyword_scores.append(key_sim)
-
-    metrics = {
-        "per_question": per_question,
-        "aggregate": {
-            "semantic_similarity_avg": round(mean(semantic_scores), 3) if semantic_scores else 0.0,
-            "keyword_overlap_avg": round(mean(keyword_scores), 3) if keyword_scores else 0.0,
-            "overall_score": round(mean([q["score"] for q in per_question]), 3) if per_question else 0.0,
-        },
-    }
-
-    evaluation.metrics = metrics
-    evaluation.status = EvaluationStatus.COMPLETED
-    project.status = ProjectStatus.EVALUATED
-    db.commit()
 
-    return evaluation
+def evaluate_project(db: Session, project_id: str, ground_truth: list[dict]) -> Evaluation:
+    return evaluate_projects(db, [(project_id, ground_truth)])[0]
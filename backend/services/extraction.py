@@ -0,0 +1,134 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator
+
+from backend.settings import settings
+
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover
+    PdfReader = None
+
+try:
+    from docx import Document as DocxDocument
+except ImportError:  # pragma: no cover
+    DocxDocument = None
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # pragma: no cover
+    load_workbook = None
+
+try:
+    from pptx import Presentation
+except ImportError:  # pragma: no cover
+    Presentation = None
+
+
+RangeExtractor = Callable[[str, int, int], Iterator[dict]]
+
+
+def _pdf_count(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def _pdf_range(path: str, start: int, stop: int) -> Iterator[dict]:
+    reader = PdfReader(path)
+    for idx in range(start, stop):
+        text = reader.pages[idx].extract_text() or ""
+        yield {"text": text, "page": idx + 1, "bbox": None}
+
+
+def _xlsx_count(path: str) -> int:
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return len(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def _xlsx_range(path: str, start: int, stop: int) -> Iterator[dict]:
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in wb.worksheets[start:stop]:
+            lines = []
+            for row in sheet.iter_rows(values_only=True):
+                row_text = "\t".join(str(cell) for cell in row if cell is not None)
+                if row_text.strip():
+                    lines.append(row_text)
+            yield {"text": "\n".join(lines), "page": None, "bbox": None, "kind": "table", "title": sheet.title}
+    finally:
+        wb.close()
+
+
+def _pptx_count(path: str) -> int:
+    return len(Presentation(path).slides)
+
+
+def _pptx_range(path: str, start: int, stop: int) -> Iterator[dict]:
+    slides = list(Presentation(path).slides)
+    for slide_idx in range(start, stop):
+        lines = []
+        for shape in slides[slide_idx].shapes:
+            if hasattr(shape, "text"):
+                if shape.text:
+                    lines.append(shape.text)
+        yield {"text": "\n\n".join(lines), "page": slide_idx + 1, "bbox": None}
+
+
+def _range_extractor(ext: str) -> tuple[Callable[[str], int], RangeExtractor] | None:
+    if ext == ".pdf" and PdfReader is not None:
+        return _pdf_count, _pdf_range
+    if ext == ".xlsx" and load_workbook is not None:
+        return _xlsx_count, _xlsx_range
+    if ext == ".pptx" and Presentation is not None:
+        return _pptx_count, _pptx_range
+    return None
+
+
+def _collect(extractor: RangeExtractor, path: str, start: int, stop: int) -> list[dict]:
+    return list(extractor(path, start, stop))
+
+
+def _extract_ranges(extractor: RangeExtractor, path: str, total: int) -> Iterator[dict]:
+    size = max(1, settings.extract_range_size)
+    ranges = [(start, min(start + size, total)) for start in range(0, total, size)]
+    workers = min(settings.extract_workers, len(ranges))
+    if workers <= 1 or total < settings.extract_parallel_min_pages:
+        yield from extractor(path, 0, total)
+        return
+
+    # Spawned workers import this module and re-import the parent's __main__ module as __mp_main__
+    # (backend.worker and the ORM under `python -m backend.worker`); neither runs startup code there.
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futures = [executor.submit(_collect, extractor, path, start, stop) for start, stop in ranges]
+        for future in futures:
+            yield from future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pages(path: Path) -> Iterator[dict]:
+    ext = path.suffix.lower()
+
+    ranged = _range_extractor(ext)
+    if ranged is not None:
+        count, extractor = ranged
+        yield from _extract_ranges(extractor, str(path), count(str(path)))
+        return
+
+    if ext == ".docx" and DocxDocument is not None:
+        doc = DocxDocument(str(path))
+        text = "\n\n".join(p.text for p in doc.paragraphs if p.text)
+        yield {"text": text, "page": None, "bbox": None}
+        return
+
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    yield {"text": text, "page": None, "bbox": None}
+
+
+def extract_pages(path: Path) -> list[dict]:
+    return list(iter_pages(path))
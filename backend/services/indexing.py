@@ -1,31 +1,114 @@
+from typing import Iterable
+
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
-from ai.retriever import upsert_chunks
-from backend.models import AnswerStatus, Project, ProjectScope, ProjectStatus
+from ai.lexical import get_lexical_index
+from ai.retriever import delete_chunks, update_chunk_metadata, upsert_chunks
+from backend.models import (
+    Answer,
+    AnswerStatus,
+    Document,
+    DocumentChunk,
+    DocumentStatus,
+    Project,
+    ProjectDocument,
+    ProjectScope,
+    ProjectStatus,
+    Question,
+)
+
+
+def _chunk_metadata(document, chunk: dict) -> dict:
+    return {
+        "document_id": document.id,
+        "chunk_id": chunk["id"],
+        "chunk_index": chunk["chunk_index"],
+        "page": chunk["page"],
+        "bbox": chunk["bbox"],
+    }
 
 
-def index_chunks(db: Session, document, chunk_models) -> None:
+def index_chunks(db: Session, document, chunks: Iterable[dict]) -> None:
     payload = []
-    for chunk in chunk_models:
+    for chunk in chunks:
         payload.append({
-            "id": chunk.id,
-            "text": chunk.text,
-            "metadata": {
-                "document_id": document.id,
-                "chunk_id": chunk.id,
-                "page": chunk.page,
-                "bbox": chunk.bbox,
-            },
+            "id": chunk["id"],
+            "text": chunk["text"],
+            "metadata": _chunk_metadata(document, chunk),
         })
     upsert_chunks(payload)
 
 
+def reindex_chunk_metadata(db: Session, document, chunks: Iterable[dict]) -> None:
+    chunks = list(chunks)
+    update_chunk_metadata([chunk["id"] for chunk in chunks], [_chunk_metadata(document, chunk) for chunk in chunks])
+
+
+def remove_chunks(chunk_ids: list[str]) -> None:
+    delete_chunks(chunk_ids)
+
+
+def backfill_lexical_index(db: Session) -> int:
+    # Documents indexed before the keyword index existed (or while it was disabled) are added from
+    # their stored chunks, so hybrid retrieval does not silently fall back to vectors only.
+    lexical = get_lexical_index()
+    if lexical is None:
+        return 0
+    indexed = lexical.document_ids()
+    missing = [
+        document_id
+        for document_id in db.scalars(select(Document.id).where(Document.status == DocumentStatus.INDEXED))
+        if document_id not in indexed
+    ]
+    for document_id in missing:
+        rows = db.execute(
+            select(DocumentChunk.id, DocumentChunk.text).where(DocumentChunk.document_id == document_id)
+        )
+        lexical.add((chunk_id, document_id, text) for chunk_id, text in rows)
+    return len(missing)
+
+
 def mark_all_docs_outdated(db: Session) -> None:
-    projects = db.query(Project).filter(Project.scope == ProjectScope.ALL_DOCS).all()
-    for project in projects:
-        project.status = ProjectStatus.OUTDATED
-        for question in project.questions:
-            for answer in question.answers:
-                if answer.status == AnswerStatus.GENERATED:
-                    answer.status = AnswerStatus.STALE
+    # One UPDATE ... FROM per table instead of walking every project, question and answer.
+    db.execute(
+        update(Project).where(Project.scope == ProjectScope.ALL_DOCS).values(status=ProjectStatus.OUTDATED),
+        execution_options={"synchronize_session": False},
+    )
+    db.execute(
+        update(Answer)
+        .where(
+            Answer.question_id == Question.id,
+            Question.project_id == Project.id,
+            Project.scope == ProjectScope.ALL_DOCS,
+            Answer.status == AnswerStatus.GENERATED,
+        )
+        .values(status=AnswerStatus.STALE),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+
+
+def mark_document_projects_outdated(db: Session, document_id: str) -> None:
+    # SELECTED_DOCS projects are not covered by mark_all_docs_outdated; only those linked to the document go stale.
+    linked = select(ProjectDocument.project_id).where(ProjectDocument.document_id == document_id)
+    db.execute(
+        update(Project)
+        .where(Project.scope == ProjectScope.SELECTED_DOCS, Project.id.in_(linked))
+        .values(status=ProjectStatus.OUTDATED),
+        execution_options={"synchronize_session": False},
+    )
+    db.execute(
+        update(Answer)
+        .where(
+            Answer.question_id == Question.id,
+            Question.project_id == ProjectDocument.project_id,
+            ProjectDocument.document_id == document_id,
+            ProjectDocument.project_id == Project.id,
+            Project.scope == ProjectScope.SELECTED_DOCS,
+            Answer.status == AnswerStatus.GENERATED,
+        )
+        .values(status=AnswerStatus.STALE),
+        execution_options={"synchronize_session": False},
+    )
     db.commit()
@@ -1,142 +1,215 @@
+import hashlib
+import mimetypes
+import queue
+import tarfile
+import threading
+import uuid
+import zipfile
+from collections import defaultdict
+from itertools import islice
 from pathlib import Path
-from typing import Iterable
+from typing import BinaryIO, Callable, Iterable, Iterator, TypeVar
 
 from fastapi import UploadFile
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
 from backend.models import Document, DocumentChunk, DocumentStatus
 from backend.settings import settings
-from backend.services.storage import save_upload_file
-from backend.services.indexing import index_chunks, mark_all_docs_outdated
-
-
-try:
-    from pypdf import PdfReader
-except ImportError:  # pragma: no cover
-    PdfReader = None
-
-try:
-    from docx import Document as DocxDocument
-except ImportError:  # pragma: no cover
-    DocxDocument = None
-
-try:
-    from openpyxl import load_workbook
-except ImportError:  # pragma: no cover
-    load_workbook = None
-
-try:
-    from pptx import Presentation
-except ImportError:  # pragma: no cover
-    Presentation = None
-
-
-def extract_pages(path: Path) -> list[dict]:
-    ext = path.suffix.lower()
-    pages: list[dict] = []
-
-    if ext == ".pdf" and PdfReader is not None:
-        reader = PdfReader(str(path))
-        for idx, page in enumerate(reader.pages):
-            text = page.extract_text() or ""
-            pages.append({"text": text, "page": idx + 1, "bbox": None})
-        return pages
-
-    if ext == ".docx" and DocxDocument is not None:
-        doc = DocxDocument(str(path))
-        text = "\n".join(p.text for p in doc.paragraphs if p.text)
-        pages.append({"text": text, "page": None, "bbox": None})
-        return pages
-
-    if ext == ".xlsx" and load_workbook is not None:
-        wb = load_workbook(str(path), data_only=True)
-        for sheet in wb.worksheets:
-            lines = []
-            for row in sheet.iter_rows(values_only=True):
-                row_text = "\t".join(str(cell) for cell in row if cell is not None)
-                if row_text.strip():
-                    lines.append(row_text)
-            pages.append({"text": "\n".join(lines), "page": None, "bbox": None})
-        return pages
-
-    if ext == ".pptx" and Presentation is not None:
-        pres = Presentation(str(path))
-        for slide_idx, slide in enumerate(pres.slides, start=1):
-            lines = []
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    if shape.text:
-                        lines.append(shape.text)
-            pages.append({"text": "\n".join(lines), "page": slide_idx, "bbox": None})
-        return pages
-
-    text = path.read_text(encoding="utf-8", errors="ignore")
-    pages.append({"text": text, "page": None, "bbox": None})
-    return pages
-
-
-def chunk_pages(pages: Iterable[dict], chunk_size: int, overlap: int) -> list[dict]:
-    chunks: list[dict] = []
-    for page in pages:
-        text = page["text"] or ""
-        if not text.strip():
-            continue
-        start = 0
-        while start < len(text):
-            end = min(start + chunk_size, len(text))
-            chunk_text = text[start:end]
-            if chunk_text.strip():
-                chunks.append({
-                    "text": chunk_text,
-                    "page": page["page"],
-                    "bbox": page["bbox"],
-                })
-            if end == len(text):
-                break
-            start = end - overlap
-    return chunks
-
-
-def process_document(db: Session, doc: Document) -> Document:
+from backend.services.chunking import iter_chunks
+from backend.services.extraction import iter_pages
+from backend.services.storage import is_archive, iter_archive, member_filename, save_stream
+from backend.services.indexing import index_chunks, reindex_chunk_metadata, remove_chunks
+
+
+T = TypeVar("T")
+
+SUPPORTED_SUFFIXES = frozenset({".pdf", ".docx", ".xlsx", ".pptx", ".txt", ".md", ".csv"})
+
+
+def _batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class _Failure:
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
+
+
+def _prefetch(items: Iterable[T], depth: int) -> Iterator[T]:
+    buffer: queue.Queue = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except Exception as exc:
+            put(_Failure(exc))
+            return
+        put(done)
+
+    threading.Thread(target=produce, name="ingest-prefetch", daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def process_document(
+    db: Session,
+    doc: Document,
+    on_progress: Callable[[float | None, str], None] | None = None,
+) -> Document:
     dest = Path(doc.storage_path)
-    pages = extract_pages(dest)
-    raw_chunks = chunk_pages(pages, settings.chunk_size, settings.chunk_overlap)
-
-    chunk_models: list[DocumentChunk] = []
-    for idx, chunk in enumerate(raw_chunks):
-        chunk_models.append(DocumentChunk(
-            document_id=doc.id,
-            chunk_index=idx,
-            text=chunk["text"],
-            page=chunk["page"],
-            bbox=chunk["bbox"],
-        ))
-    db.add_all(chunk_models)
-    doc.status = DocumentStatus.PARSED
+    chunks = iter_chunks(iter_pages(dest))
+    batches = _prefetch(_batched(chunks, max(1, settings.ingest_batch_size)), settings.ingest_queue_depth)
+
+    # Chunks already stored for this document (a replaced upload or a retried run) are
+    # matched by content hash so unchanged text keeps its id and vector.
+    existing: dict[str | None, list[str]] = defaultdict(list)
+    for chunk_id, chunk_hash in db.query(DocumentChunk.id, DocumentChunk.content_hash).filter(
+        DocumentChunk.document_id == doc.id
+    ):
+        existing[chunk_hash].append(chunk_id)
+
+    doc.indexed_chunks = 0
     db.commit()
 
-    index_chunks(db, doc, chunk_models)
+    chunk_index = 0
+    reused_count = 0
+    for batch in batches:
+        new_rows = []
+        reused_rows = []
+        for chunk in batch:
+            chunk_hash = content_hash(chunk["text"])
+            row = {
+                "document_id": doc.id,
+                "chunk_index": chunk_index,
+                "text": chunk["text"],
+                "page": chunk["page"],
+                "bbox": chunk["bbox"],
+                "content_hash": chunk_hash,
+            }
+            if existing.get(chunk_hash):
+                row["id"] = existing[chunk_hash].pop()
+                reused_rows.append(row)
+            else:
+                row["id"] = str(uuid.uuid4())
+                new_rows.append(row)
+            chunk_index += 1
+
+        if new_rows:
+            db.execute(insert(DocumentChunk), new_rows)
+            index_chunks(db, doc, new_rows)
+        if reused_rows:
+            db.execute(update(DocumentChunk), [
+                {key: row[key] for key in ("id", "chunk_index", "page", "bbox")} for row in reused_rows
+            ])
+            reindex_chunk_metadata(db, doc, reused_rows)
+        reused_count += len(reused_rows)
+        doc.indexed_chunks = chunk_index
+        doc.status = DocumentStatus.PARSED
+        db.commit()
+        if on_progress is not None:
+            on_progress(None, f"{chunk_index} chunks indexed ({reused_count} reused)")
+
+    removed = [chunk_id for ids in existing.values() for chunk_id in ids]
+    for batch in _batched(removed, max(1, settings.ingest_batch_size)):
+        db.query(DocumentChunk).filter(DocumentChunk.id.in_(batch)).delete(synchronize_session=False)
+        remove_chunks(batch)
+        db.commit()
+
     doc.status = DocumentStatus.INDEXED
     db.commit()
-
-    mark_all_docs_outdated(db)
+    if on_progress is not None:
+        on_progress(None, f"{chunk_index} chunks indexed ({reused_count} reused, {len(removed)} removed)")
     return doc
 
 
-def ingest_document(db: Session, upload: UploadFile) -> Document:
-    doc = Document(
-        filename=upload.filename,
-        content_type=upload.content_type or "application/octet-stream",
-        status=DocumentStatus.UPLOADED,
-        storage_path="",
-    )
-    db.add(doc)
-    db.commit()
-    db.refresh(doc)
-
-    dest = Path(settings.storage_path) / f"{doc.id}_{upload.filename}"
-    save_upload_file(upload, dest)
-    doc.storage_path = str(dest)
-    db.commit()
-
-    return process_document(db, doc)
+def stage_uploads(db: Session, uploads: list[UploadFile]) -> tuple[list[Document], list[dict], list[dict]]:
+    storage = Path(settings.storage_path)
+    incoming = storage / ".incoming"
+    created: list[Document] = []
+    duplicates: list[dict] = []
+    skipped: list[dict] = []
+    seen: dict[str, str] = {}
+
+    def stage(filename: str, source: BinaryIO, content_type: str | None) -> None:
+        # Files are hashed while they stream to disk, so nothing is held in memory whole.
+        staged = incoming / str(uuid.uuid4())
+        try:
+            digest = save_stream(source, staged)
+        except Exception:
+            staged.unlink(missing_ok=True)
+            raise
+        existing_id = seen.get(digest) or db.scalars(
+            select(Document.id)
+            .where(Document.content_hash == digest, Document.status != DocumentStatus.FAILED)
+            .limit(1)
+        ).first()
+        if existing_id is not None:
+            staged.unlink(missing_ok=True)
+            duplicates.append({"filename": filename, "document_id": existing_id})
+            return
+        doc = Document(
+            id=str(uuid.uuid4()),
+            filename=filename,
+            content_type=content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            status=DocumentStatus.UPLOADED,
+            content_hash=digest,
+            storage_path="",
+        )
+        dest = storage / f"{doc.id}_{filename}"
+        staged.replace(dest)
+        doc.storage_path = str(dest)
+        db.add(doc)
+        seen[digest] = doc.id
+        created.append(doc)
+
+    try:
+        for upload in uploads:
+            if not is_archive(upload.filename or ""):
+                stage(upload.filename, upload.file, upload.content_type)
+                continue
+            for name, member in iter_archive(upload.filename, upload.file):
+                filename = member_filename(name)
+                if filename is None:
+                    skipped.append({"filename": name, "reason": "unsafe or hidden path"})
+                    continue
+                if Path(filename).suffix.lower() not in SUPPORTED_SUFFIXES:
+                    skipped.append({"filename": name, "reason": "unsupported file type"})
+                    continue
+                stage(filename, member, None)
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        for doc in created:
+            Path(doc.storage_path).unlink(missing_ok=True)
+        if isinstance(exc, (zipfile.BadZipFile, tarfile.TarError)):
+            raise ValueError(f"Unreadable archive: {exc}") from exc
+        raise
+    return created, duplicates, skipped
@@ -0,0 +1,142 @@
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from backend.models import Job, JobStatus
+from backend.settings import settings
+
+
+JobHandler = Callable[[Session, Job], None]
+
+_handlers: dict[str, JobHandler] = {}
+
+
+def register(kind: str) -> Callable[[JobHandler], JobHandler]:
+    def decorator(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict,
+    max_attempts: int | None = None,
+    delay: float = 0.0,
+) -> Job:
+    job = Job(
+        kind=kind,
+        payload=payload,
+        status=JobStatus.QUEUED,
+        max_attempts=max_attempts or settings.job_max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def enqueue_coalesced(db: Session, kind: str, payload: dict, delay: float = 0.0) -> Job:
+    # A job of the same kind that has not started yet will see this request's changes too.
+    pending = db.scalars(select(Job).where(Job.kind == kind, Job.status == JobStatus.QUEUED).limit(1)).first()
+    if pending is not None:
+        return pending
+    return enqueue(db, kind, payload, delay=delay)
+
+
+def claim_job(db: Session, worker_id: str) -> Job | None:
+    now = datetime.utcnow()
+    stmt = (
+        select(Job.id)
+        .where(Job.status == JobStatus.QUEUED, Job.run_after <= now)
+        .order_by(Job.run_after)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job_id = db.scalars(stmt).first()
+    if job_id is None:
+        db.rollback()
+        return None
+
+    # The status guard keeps the claim atomic on SQLite, which ignores FOR UPDATE.
+    claimed = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+        .values(
+            status=JobStatus.RUNNING,
+            attempts=Job.attempts + 1,
+            locked_by=worker_id,
+            locked_at=now,
+        )
+    )
+    db.commit()
+    if claimed.rowcount != 1:
+        return None
+    return db.get(Job, job_id)
+
+
+def requeue_stale_jobs(db: Session) -> None:
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.job_lease_seconds)
+    stale = (Job.status == JobStatus.RUNNING, Job.locked_at < cutoff)
+    # The crashed attempt was already counted when the job was claimed.
+    db.execute(
+        update(Job)
+        .where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status=JobStatus.FAILED, locked_by=None, locked_at=None, error="Job lease expired on the final attempt")
+    )
+    db.execute(
+        update(Job)
+        .where(*stale)
+        .values(status=JobStatus.QUEUED, locked_by=None, locked_at=None)
+    )
+    db.commit()
+
+
+def set_progress(db: Session, job: Job, progress: float | None, detail: str | None = None) -> None:
+    if progress is not None:
+        job.progress = round(min(1.0, max(0.0, progress)), 3)
+    if detail is not None:
+        job.detail = detail[:255]
+    job.locked_at = datetime.utcnow()
+    db.commit()
+
+
+def renew_lease(db: Session, job_id: str, worker_id: str) -> None:
+    # Refreshes only the lease, so helper threads can call it through their own sessions.
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == JobStatus.RUNNING, Job.locked_by == worker_id)
+        .values(locked_at=datetime.utcnow())
+    )
+    db.commit()
+
+
+def run_job(db: Session, job: Job) -> None:
+    handler = _handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind {job.kind!r}")
+        handler(db, job)
+    except Exception:
+        db.rollback()
+        job.error = traceback.format_exc()
+        job.locked_by = None
+        job.locked_at = None
+        if job.attempts < job.max_attempts:
+            job.status = JobStatus.QUEUED
+            job.run_after = datetime.utcnow() + timedelta(seconds=settings.job_retry_backoff * job.attempts)
+        else:
+            job.status = JobStatus.FAILED
+        db.commit()
+        return
+
+    job.status = JobStatus.COMPLETED
+    job.progress = 1.0
+    job.locked_by = None
+    job.locked_at = None
+    db.commit()
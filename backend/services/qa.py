@@ -1,13 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
 from statistics import mean
+from typing import Callable
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
 
 from ai.llm import generate_answer
-from ai.retriever import query
-from backend.models import Answer, AnswerStatus, Project, ProjectScope, ProjectStatus
+from ai.retriever import query_many
+from backend.models import Answer, AnswerStatus, Project, ProjectScope, ProjectStatus, Question
+from backend.services.context import assemble_context
 from backend.settings import settings
 
 
+REVIEWED_STATUSES = (AnswerStatus.CONFIRMED, AnswerStatus.MANUAL_UPDATED)
+
+
 def build_prompt(question: str, contexts: list[str]) -> str:
     joined = "\n\n".join(contexts)
     return (
@@ -42,7 +49,70 @@ def _prepare_citations(metadatas: list[dict], distances: list[float], documents:
     return citations
 
 
-def generate_answers_for_project(db: Session, project_id: str) -> None:
+def _answer_question(
+    question: str,
+    results: dict,
+    previous_ids: list[str] | None = None,
+    use_cache: bool = True,
+) -> dict | None:
+    ids = results.get("ids", [[]])[0]
+    documents = results.get("documents", [[]])[0]
+    metadatas = results.get("metadatas", [[]])[0]
+    distances = results.get("distances", [[]])[0]
+
+    if previous_ids is not None and set(ids) == set(previous_ids):
+        return None
+
+    if not ids:
+        return {
+            "status": AnswerStatus.MISSING_DATA,
+            "ai_answer_text": "No relevant documents found.",
+            "ai_answerable": False,
+            "ai_confidence": 0.0,
+            "ai_citations": [],
+            "context_chunk_ids": [],
+        }
+
+    confidence = _confidence_from_distances(distances)
+    answerable = confidence >= settings.min_similarity
+
+    if not answerable:
+        return {
+            "status": AnswerStatus.MISSING_DATA,
+            "ai_answer_text": "Insufficient evidence to answer from the indexed documents.",
+            "ai_answerable": False,
+            "ai_confidence": confidence,
+            "ai_citations": _prepare_citations(metadatas, distances, documents),
+            "context_chunk_ids": ids,
+        }
+
+    passages, citations = assemble_context(documents, metadatas, distances)
+    prompt = build_prompt(question, passages)
+    response = generate_answer(prompt, use_cache=use_cache)
+
+    return {
+        "status": AnswerStatus.GENERATED,
+        "ai_answer_text": response,
+        "ai_answerable": True,
+        "ai_confidence": confidence,
+        "ai_citations": citations,
+        "context_chunk_ids": ids,
+    }
+
+
+def _previous_context(answer: Answer | None) -> list[str] | None:
+    if answer is None or answer.status == AnswerStatus.PENDING or answer.ai_answer_text is None:
+        return None
+    return answer.context_chunk_ids
+
+
+def generate_answers_for_project(
+    db: Session,
+    project_id: str,
+    on_progress: Callable[[float | None, str], None] | None = None,
+    only_changed: bool = False,
+    use_cache: bool = True,
+) -> None:
     project = db.get(Project, project_id)
     if project is None:
         return
@@ -55,44 +125,45 @@ def generate_answers_for_project(db: Session, project_id: str) -> None:
         doc_ids = [pd.document_id for pd in project.documents]
         where = {"document_id": {"$in": doc_ids}} if doc_ids else {"document_id": "__none__"}
 
-    for question in project.questions:
-        results = query(question.text, settings.top_k, where=where)
-        ids = results.get("ids", [[]])[0]
-        documents = results.get("documents", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0]
-        distances = results.get("distances", [[]])[0]
-
-        answer = question.answers[0] if question.answers else Answer(question_id=question.id)
-        if not question.answers:
-            db.add(answer)
-
-        if not ids:
-            answer.status = AnswerStatus.MISSING_DATA
-            answer.ai_answer_text = "No relevant documents found."
-            answer.ai_answerable = False
-            answer.ai_confidence = 0.0
-            answer.ai_citations = []
+    questions = db.scalars(
+        select(Question)
+        .where(Question.project_id == project_id)
+        .options(selectinload(Question.answers))
+        .order_by(Question.order_index)
+    ).all()
+    pending = []
+    for question in questions:
+        answer = question.answers[0] if question.answers else None
+        if only_changed and answer is not None and answer.status in REVIEWED_STATUSES:
             continue
-
-        confidence = _confidence_from_distances(distances)
-        answerable = confidence >= settings.min_similarity
-
-        if not answerable:
-            answer.status = AnswerStatus.MISSING_DATA
-            answer.ai_answer_text = "Insufficient evidence to answer from the indexed documents."
-            answer.ai_answerable = False
-            answer.ai_confidence = confidence
-            answer.ai_citations = _prepare_citations(metadatas, distances, documents)
-            continue
-
-        prompt = build_prompt(question.text, documents)
-        response = generate_answer(prompt)
-
-        answer.status = AnswerStatus.GENERATED
-        answer.ai_answer_text = response
-        answer.ai_answerable = True
-        answer.ai_confidence = confidence
-        answer.ai_citations = _prepare_citations(metadatas, distances, documents)
+        if answer is None:
+            answer = Answer(question_id=question.id)
+            db.add(answer)
+        previous_ids = _previous_context(answer) if only_changed else None
+        pending.append((question.text, answer, previous_ids))
+
+    mode = (project.config or {}).get("retrieval_mode")
+    retrievals = query_many([text for text, _, _ in pending], settings.top_k, where=where, mode=mode)
+    tasks = [(text, results, previous_ids) for (text, _, previous_ids), results in zip(pending, retrievals)]
+    batch_size = max(1, settings.generation_commit_batch)
+    regenerated = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, settings.generation_concurrency)) as executor:
+        results = executor.map(lambda task: _answer_question(*task, use_cache=use_cache), tasks)
+        for idx, ((_, answer, _), fields) in enumerate(zip(pending, results), start=1):
+            if fields is None:
+                # Retrieval returned the same evidence, so the stored answer still holds.
+                if answer.status == AnswerStatus.STALE:
+                    answer.status = AnswerStatus.GENERATED if answer.ai_answerable else AnswerStatus.MISSING_DATA
+            else:
+                regenerated += 1
+                for key, value in fields.items():
+                    setattr(answer, key, value)
+            # The last, possibly partial, batch reports too so progress reaches 100%.
+            if idx % batch_size == 0 or idx == len(pending):
+                db.commit()
+                if on_progress is not None:
+                    on_progress(idx / len(pending), f"{idx}/{len(pending)} questions checked, {regenerated} regenerated")
 
     project.status = ProjectStatus.REVIEW
     db.commit()
@@ -3,9 +3,12 @@ from pathlib import Path
 from typing import Iterable
 
 from fastapi import UploadFile
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
 
+from backend.models import Answer, AnswerStatus, Question
 from backend.settings import settings
-from backend.services.ingestion import extract_pages
+from backend.services.extraction import extract_pages
 from backend.services.storage import save_upload_file
 
 
@@ -64,3 +67,23 @@ def parse_questionnaire_file(upload: UploadFile) -> list[dict]:
     pages = extract_pages(dest)
     full_text = "\n".join(page.get("text", "") for page in pages)
     return parse_questionnaire_text(full_text)
+
+
+def create_questions(db: Session, project_id: str, parsed_questions: Iterable[dict]) -> int:
+    # Ids are generated client-side so questions and their answers go out as two multi-row INSERTs.
+    question_rows = []
+    answer_rows = []
+    for q in parsed_questions:
+        question_id = str(uuid.uuid4())
+        question_rows.append({
+            "id": question_id,
+            "project_id": project_id,
+            "section": q["section"],
+            "order_index": q["order_index"],
+            "text": q["text"],
+        })
+        answer_rows.append({"id": str(uuid.uuid4()), "question_id": question_id, "status": AnswerStatus.PENDING})
+    if question_rows:
+        db.execute(insert(Question), question_rows)
+        db.execute(insert(Answer), answer_rows)
+    return len(question_rows)
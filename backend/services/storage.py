@@ -1,9 +1,55 @@
-from pathlib import Path
-import shutil
+from pathlib import Path, PurePosixPath
+import hashlib
+import tarfile
+import zipfile
+from typing import BinaryIO, Iterator
 from fastapi import UploadFile
 
 
-def save_upload_file(upload: UploadFile, dest: Path) -> None:
+COPY_BLOCK_SIZE = 1024 * 1024
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+def save_stream(source: BinaryIO, dest: Path) -> str:
     dest.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
     with dest.open("wb") as buffer:
-        shutil.copyfileobj(upload.file, buffer)
+        while block := source.read(COPY_BLOCK_SIZE):
+            digest.update(block)
+            buffer.write(block)
+    return digest.hexdigest()
+
+
+def save_upload_file(upload: UploadFile, dest: Path) -> str:
+    return save_stream(upload.file, dest)
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def iter_archive(filename: str, fileobj: BinaryIO) -> Iterator[tuple[str, BinaryIO]]:
+    # Members are yielded as open streams, one at a time; nothing is extracted up front.
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as member:
+                    yield info.filename, member
+        return
+
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+            member = archive.extractfile(info)
+            if member is not None:
+                yield info.name, member
+
+
+def member_filename(name: str) -> str | None:
+    path = PurePosixPath(name.replace("\\", "/"))
+    if "__MACOSX" in path.parts or any(part.startswith(".") for part in path.parts):
+        return None
+    return path.name or None
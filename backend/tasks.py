@@ -0,0 +1,153 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from sqlalchemy.orm import Session
+
+from ai.retriever import delete_document
+from backend.db import SessionLocal
+from backend.models import (
+    Document,
+    DocumentChunk,
+    DocumentStatus,
+    Evaluation,
+    EvaluationStatus,
+    Job,
+    Project,
+    ProjectStatus,
+)
+from backend.services.evaluation import run_evaluations
+from backend.services.indexing import backfill_lexical_index, mark_all_docs_outdated, mark_document_projects_outdated
+from backend.services.ingestion import process_document
+from backend.services.jobs import enqueue_coalesced, register, renew_lease, set_progress
+from backend.services.qa import generate_answers_for_project
+from backend.settings import settings
+
+
+PROCESS_DOCUMENT = "process_document"
+REPLACE_DOCUMENT = "replace_document"
+GENERATE_ANSWERS = "generate_answers"
+EVALUATE = "evaluate"
+MARK_OUTDATED = "mark_outdated"
+INGEST_BATCH = "ingest_batch"
+BACKFILL_LEXICAL = "backfill_lexical"
+
+logger = logging.getLogger(__name__)
+
+
+def _reporter(db: Session, job: Job):
+    return lambda progress, detail: set_progress(db, job, progress, detail)
+
+
+def _index_document(db: Session, job: Job, doc: Document) -> None:
+    try:
+        process_document(db, doc, on_progress=_reporter(db, job))
+    except Exception:
+        db.rollback()
+        doc.status = DocumentStatus.FAILED
+        db.commit()
+        raise
+    mark_document_projects_outdated(db, doc.id)
+    # Documents finishing in a burst share one staleness pass.
+    enqueue_coalesced(db, MARK_OUTDATED, {}, delay=settings.staleness_coalesce_seconds)
+
+
+@register(PROCESS_DOCUMENT)
+def process_document_job(db: Session, job: Job) -> None:
+    doc = db.get(Document, job.payload["document_id"])
+    if doc is None:
+        return
+
+    # A retried job must not leave duplicate chunks from an earlier partial run.
+    db.query(DocumentChunk).filter(DocumentChunk.document_id == doc.id).delete()
+    db.commit()
+    delete_document(doc.id)
+
+    _index_document(db, job, doc)
+
+
+@register(REPLACE_DOCUMENT)
+def replace_document_job(db: Session, job: Job) -> None:
+    doc = db.get(Document, job.payload["document_id"])
+    if doc is None:
+        return
+    # Existing chunks are kept; process_document diffs them against the new file by content hash.
+    _index_document(db, job, doc)
+
+
+def _ingest_one(job_id: str, worker_id: str, document_id: str) -> bool:
+    # Each pipeline slot gets its own session; a failed file does not stop the batch.
+    with SessionLocal() as db:
+        doc = db.get(Document, document_id)
+        if doc is None or doc.status == DocumentStatus.INDEXED:
+            return True
+        try:
+            # A slow document must keep the batch's lease alive while earlier results wait in map order.
+            process_document(db, doc, on_progress=lambda progress, detail: renew_lease(db, job_id, worker_id))
+        except Exception:
+            logger.exception("Failed to ingest document %s", document_id)
+            db.rollback()
+            doc.status = DocumentStatus.FAILED
+            db.commit()
+            return False
+    return True
+
+
+@register(INGEST_BATCH)
+def ingest_batch_job(db: Session, job: Job) -> None:
+    document_ids = job.payload["document_ids"]
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, settings.ingest_concurrency)) as executor:
+        for idx, ok in enumerate(executor.map(partial(_ingest_one, job.id, job.locked_by), document_ids), start=1):
+            failed += not ok
+            set_progress(db, job, idx / len(document_ids), f"{idx}/{len(document_ids)} documents processed, {failed} failed")
+    # The whole batch shares one staleness pass.
+    mark_all_docs_outdated(db)
+
+
+@register(MARK_OUTDATED)
+def mark_outdated_job(db: Session, job: Job) -> None:
+    mark_all_docs_outdated(db)
+
+
+@register(BACKFILL_LEXICAL)
+def backfill_lexical_job(db: Session, job: Job) -> None:
+    added = backfill_lexical_index(db)
+    set_progress(db, job, 1.0, f"{added} documents added to the keyword index")
+
+
+@register(GENERATE_ANSWERS)
+def generate_answers_job(db: Session, job: Job) -> None:
+    project_id = job.payload["project_id"]
+    try:
+        generate_answers_for_project(
+            db,
+            project_id,
+            on_progress=_reporter(db, job),
+            only_changed=job.payload.get("only_changed", False),
+            use_cache=job.payload.get("use_cache", True),
+        )
+    except Exception:
+        db.rollback()
+        project = db.get(Project, project_id)
+        if project is not None:
+            project.status = ProjectStatus.FAILED
+            db.commit()
+        raise
+
+
+@register(EVALUATE)
+def evaluate_job(db: Session, job: Job) -> None:
+    items = []
+    for item in job.payload["items"]:
+        evaluation = db.get(Evaluation, item["evaluation_id"])
+        if evaluation is not None:
+            items.append((evaluation, item["ground_truth"]))
+    try:
+        run_evaluations(db, items, on_progress=_reporter(db, job))
+    except Exception:
+        db.rollback()
+        for evaluation, _ in items:
+            evaluation.status = EvaluationStatus.FAILED
+        db.commit()
+        raise
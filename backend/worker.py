@@ -0,0 +1,74 @@
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+
+from backend.db import SessionLocal, upgrade_database
+from backend.services.jobs import claim_job, requeue_stale_jobs, run_job
+from backend.settings import settings
+import backend.tasks  # noqa: F401  (registers job handlers)
+
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(stop_event: threading.Event, worker_id: str | None = None) -> None:
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    while not stop_event.is_set():
+        job = None
+        db = SessionLocal()
+        try:
+            requeue_stale_jobs(db)
+            job = claim_job(db, worker_id)
+            if job is not None:
+                run_job(db, job)
+        except Exception:
+            logger.exception("Job worker %s failed to poll the queue", worker_id)
+        finally:
+            db.close()
+        if job is None:
+            stop_event.wait(settings.job_poll_interval)
+
+
+def start_workers(count: int) -> tuple[threading.Event, list[threading.Thread]]:
+    stop_event = threading.Event()
+    threads = []
+    for idx in range(count):
+        thread = threading.Thread(target=run_worker, args=(stop_event,), name=f"job-worker-{idx}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return stop_event, threads
+
+
+def stop_workers(stop_event: threading.Event, threads: list[threading.Thread], timeout: float) -> None:
+    stop_event.set()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(timeout=max(0.0, deadline - time.monotonic()))
+    # Daemon threads still running a job die with the process; the job's lease expires and it is requeued.
+    running = [thread.name for thread in threads if thread.is_alive()]
+    if running:
+        logger.warning("Job workers still running after %gs: %s", timeout, ", ".join(running))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background job workers.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of worker threads.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if settings.auto_migrate:
+        upgrade_database()
+    stop_event, threads = start_workers(max(1, args.concurrency))
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1.0)
+    except KeyboardInterrupt:
+        stop_workers(stop_event, threads, settings.job_shutdown_timeout)
+
+
+if __name__ == "__main__":
+    main()
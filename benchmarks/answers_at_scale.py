@@ -0,0 +1,142 @@
+"""Seed a database with many answers and time listing and stale-marking.
+
+    python -m benchmarks.answers_at_scale --answers 100000
+    python -m benchmarks.answers_at_scale --answers 100000 --without-indexes
+
+Uses a throwaway SQLite file unless --database-url is given.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=100_000)
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--without-indexes", action="store_true", help="Benchmark the schema before the index revision.")
+    return parser.parse_args()
+
+
+args = _parse_args()
+if args.database_url is None:
+    args.database_url = f"sqlite:///{tempfile.mkdtemp(prefix='qa-bench-')}/bench.db"
+os.environ["QA_DATABASE_URL"] = args.database_url
+os.environ["QA_EMBEDDED_WORKERS"] = "0"
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from fastapi import Response  # noqa: E402
+from sqlalchemy import insert, update  # noqa: E402
+
+from backend.db import SessionLocal, upgrade_database  # noqa: E402
+from backend.main import get_project_review, list_answers, update_project  # noqa: E402
+from backend.models import Answer, AnswerStatus, Project, ProjectScope, ProjectStatus, Question  # noqa: E402
+from backend.schemas import ProjectUpdate  # noqa: E402
+from backend.services.indexing import mark_all_docs_outdated  # noqa: E402
+
+
+def _seed(total: int, projects: int) -> list[str]:
+    per_project = max(1, total // projects)
+    project_ids = [str(uuid.uuid4()) for _ in range(projects)]
+    start = datetime.utcnow() - timedelta(days=1)
+    with SessionLocal() as db:
+        db.execute(insert(Project), [
+            {
+                "id": project_id,
+                "name": f"bench-{idx}",
+                "scope": ProjectScope.ALL_DOCS,
+                "status": ProjectStatus.REVIEW,
+                "config": {},
+                "created_at": start + timedelta(seconds=idx),
+                "updated_at": start,
+            }
+            for idx, project_id in enumerate(project_ids)
+        ])
+        for project_id in project_ids:
+            questions = [
+                {"id": str(uuid.uuid4()), "project_id": project_id, "order_index": idx, "text": f"Question {idx}?"}
+                for idx in range(per_project)
+            ]
+            db.execute(insert(Question), questions)
+            db.execute(insert(Answer), [
+                {
+                    "id": str(uuid.uuid4()),
+                    "question_id": question["id"],
+                    "status": AnswerStatus.CONFIRMED if idx % 5 == 0 else AnswerStatus.GENERATED,
+                    "ai_answer_text": "Yes, we do.",
+                    "created_at": start,
+                    "updated_at": start,
+                }
+                for idx, question in enumerate(questions)
+            ])
+        db.commit()
+    return project_ids
+
+
+def _reset(db) -> None:
+    db.execute(update(Answer).where(Answer.status == AnswerStatus.STALE).values(status=AnswerStatus.GENERATED))
+    db.commit()
+
+
+def _timed(fn, repeat: int, setup=None) -> float:
+    samples = []
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            if setup is not None:
+                setup(db)
+            started = time.perf_counter()
+            fn(db)
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def _walk_answers(db, project_id: str) -> None:
+    after = None
+    while True:
+        response = Response()
+        list_answers(project_id, response, limit=100, after=after, fields=None, db=db)
+        after = response.headers.get("x-next-cursor")
+        if not after:
+            return
+
+
+def main() -> None:
+    upgrade_database()
+    if args.without_indexes:
+        config = Config("alembic.ini")
+        config.attributes["configure_logger"] = False
+        # Only the index revisions are undone; the ORM still needs the job and tracking columns.
+        command.downgrade(config, "0002_jobs_and_tracking")
+
+    started = time.perf_counter()
+    project_ids = _seed(args.answers, args.projects)
+    print(f"seeded {args.answers} answers in {args.projects} projects in {time.perf_counter() - started:.1f}s")
+    print(f"schema: {'0002_jobs_and_tracking (no indexes)' if args.without_indexes else 'head'}  database: {args.database_url}")
+
+    target = project_ids[len(project_ids) // 2]
+    results = {
+        "list answers, first page (100)": _timed(
+            lambda db: list_answers(target, Response(), limit=100, after=None, fields=None, db=db), args.repeat
+        ),
+        "list answers, all pages of one project": _timed(lambda db: _walk_answers(db, target), args.repeat),
+        "review bundle, one project": _timed(lambda db: get_project_review(target, db=db), args.repeat),
+        "mark one project stale (PATCH /projects)": _timed(
+            lambda db: update_project(target, ProjectUpdate(config={"bench": True}), db=db), args.repeat, setup=_reset
+        ),
+        "mark all ALL_DOCS projects stale": _timed(mark_all_docs_outdated, max(1, args.repeat // 2), setup=_reset),
+    }
+    width = max(len(name) for name in results)
+    for name, millis in results.items():
+        print(f"{name:<{width}}  {millis:10.1f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Compare vector store backends on random vectors: ingest, open, and filtered search.
+
+    python -m benchmarks.vector_stores --chunks 20000 --dim 768
+    python -m benchmarks.vector_stores --stores chroma --without-partitions
+    python -m benchmarks.vector_stores --stores flat --chunks 100000
+
+Each store is built in a throwaway directory.
+"""
+import argparse
+import functools
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", default="chroma,flat")
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--selected", type=int, default=5, help="Documents in a filtered (SELECTED_DOCS) search.")
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--without-partitions", action="store_true", help="Chroma: filter the global collection only.")
+    return parser.parse_args()
+
+
+args = _parse_args()
+
+from ai.vector_store import _stores  # noqa: E402
+
+
+def _timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def _ingest(store, vectors: np.ndarray, document_ids: list[str], batch_size: int = 128) -> None:
+    for start in range(0, len(vectors), batch_size):
+        stop = min(start + batch_size, len(vectors))
+        ids = [str(uuid.uuid4()) for _ in range(start, stop)]
+        # Chunks arrive document after document, as they do from the ingestion pipeline.
+        metadatas = [
+            {
+                "document_id": document_ids[row * len(document_ids) // len(vectors)],
+                "chunk_id": chunk_id,
+                "chunk_index": row,
+            }
+            for row, chunk_id in zip(range(start, stop), ids)
+        ]
+        store.upsert(ids, [f"chunk {row}" for row in range(start, stop)], vectors[start:stop].tolist(), metadatas)
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.chunks, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32).tolist()
+    document_ids = [str(uuid.uuid4()) for _ in range(args.documents)]
+    selected = document_ids[:args.selected]
+    print(f"{args.chunks} chunks x {args.dim} dims in {args.documents} documents, {args.queries} queries per search")
+
+    for name in args.stores.split(","):
+        path = tempfile.mkdtemp(prefix=f"qa-bench-{name}-")
+        store_type = _stores[name]
+        if name == "chroma":
+            store_type = functools.partial(store_type, partitioned=not args.without_partitions)
+        started = time.perf_counter()
+        _ingest(store_type(path), vectors, document_ids)
+        ingest_seconds = time.perf_counter() - started
+
+        store = store_type(path)
+        started = time.perf_counter()
+        store.query(queries[:1], args.top_k)
+        first_ms = (time.perf_counter() - started) * 1000
+        opened_ms = _timed(lambda: store_type(path).query(queries[:1], args.top_k), args.repeat)
+
+        results = {
+            "ingest": ingest_seconds * 1000,
+            "first search after ingest": first_ms,
+            "open + one search": opened_ms,
+            "search, all documents": _timed(lambda: store.query(queries, args.top_k), args.repeat),
+            f"search, {args.selected} selected documents": _timed(
+                lambda: store.query(queries, args.top_k, selected), args.repeat
+            ),
+        }
+        print(f"\n[{name}]  {path}")
+        width = max(len(label) for label in results)
+        for label, millis in results.items():
+            print(f"{label:<{width}}  {millis:10.1f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
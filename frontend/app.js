@@ -33,6 +33,7 @@ const ui = {
   projectDetail: byId("projectDetail"),
   answerList: byId("answerList"),
   generateAnswers: byId("generateAnswers"),
+  refreshStale: byId("refreshStale"),
   refreshProject: byId("refreshProject"),
   runEval: byId("runEval"),
   evalSearch: byId("evalSearch"),
@@ -40,6 +41,11 @@ const ui = {
   evalClearAll: byId("evalClearAll"),
   evaluationList: byId("evaluationList"),
   evalResult: byId("evalResult"),
+  chatQuery: byId("chatQuery"),
+  sendChat: byId("sendChat"),
+  chatAnswer: byId("chatAnswer"),
+  chatMeta: byId("chatMeta"),
+  chatCitations: byId("chatCitations"),
   toast: byId("toast"),
 };
 
@@ -65,7 +71,7 @@ const statusClassMap = {
   INDEXED: "success",
 };
 
-const api = async (path, options = {}) => {
+const request = async (path, options = {}) => {
   const res = await fetch(path, options);
   const contentType = res.headers.get("content-type") || "";
   const payload = contentType.includes("application/json") ? await res.json() : await res.text();
@@ -73,7 +79,23 @@ const api = async (path, options = {}) => {
     const message = typeof payload === "string" ? payload : payload.detail || JSON.stringify(payload);
     throw new Error(message || res.statusText);
   }
-  return payload;
+  return { payload, headers: res.headers };
+};
+
+const api = async (path, options = {}) => (await request(path, options)).payload;
+
+// List endpoints return one page at a time; follow X-Next-Cursor until the last page.
+const apiAll = async (path) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const separator = path.includes("?") ? "&" : "?";
+    const url = cursor ? `${path}${separator}after=${encodeURIComponent(cursor)}` : path;
+    const { payload, headers } = await request(url);
+    items.push(...payload);
+    cursor = headers.get("X-Next-Cursor");
+  } while (cursor);
+  return items;
 };
 
 const setStatus = (el, message, type = "info") => {
@@ -217,6 +239,7 @@ const renderDocuments = (documents) => {
       <div class="project-meta">
         ${statusPill(doc.status)}
         <span>${escapeHtml(shortId(doc.id))}</span>
+        <span>${escapeHtml(doc.indexed_chunks ?? 0)} chunks</span>
         <span>${escapeHtml(formatDate(doc.created_at))}</span>
       </div>
     `;
@@ -529,11 +552,7 @@ const loadProject = async (projectId) => {
     ui.projectDetail.classList.add("loading");
   }
   try {
-    const [detail, questions, answers] = await Promise.all([
-      api(`/projects/${projectId}`),
-      api(`/projects/${projectId}/questions`),
-      api(`/projects/${projectId}/answers`),
-    ]);
+    const { project: detail, questions, answers } = await api(`/projects/${projectId}/review`);
     state.questions = questions;
     state.answers = answers;
     renderProjectDetail(detail);
@@ -561,7 +580,7 @@ const refreshProjects = async () => {
   setBusy(ui.refreshProjects, true, "Refreshing...");
   setListLoading(ui.projectList, 3);
   try {
-    const projects = await api("/projects");
+    const projects = await apiAll("/projects");
     state.projects = projects;
     renderProjects(projects);
   } catch (err) {
@@ -574,7 +593,7 @@ const refreshProjects = async () => {
 const refreshDocuments = async () => {
   setListLoading(ui.docList, 2);
   try {
-    const documents = await api("/documents");
+    const documents = await apiAll("/documents");
     state.documents = documents;
     renderDocuments(documents);
     renderProjectDocOptions(documents);
@@ -610,19 +629,35 @@ if (ui.clearDocs) {
   };
 }
 
-ui.uploadDoc.onclick = async () => {
-  const file = ui.docFile.files[0];
-  if (!file) return;
+const ARCHIVE_PATTERN = /\.(zip|tar|tar\.gz|tgz|tar\.bz2|tbz2|tar\.xz|txz)$/i;
+
+const uploadBulk = async (files) => {
   const fd = new FormData();
-  fd.append("file", file);
+  files.forEach((file) => fd.append("files", file));
+  const result = await api("/documents/bulk", { method: "POST", body: fd });
+  const parts = [`${result.documents.length} uploaded`];
+  if (result.duplicates.length) parts.push(`${result.duplicates.length} duplicates skipped`);
+  if (result.skipped.length) parts.push(`${result.skipped.length} not ingested`);
+  setStatus(ui.docStatus, parts.join(", "), "success");
+};
+
+ui.uploadDoc.onclick = async () => {
+  const files = Array.from(ui.docFile.files);
+  if (!files.length) return;
   setStatus(ui.docStatus, "Uploading...", "info");
   setAppStatus("Uploading document...");
   setBusy(ui.uploadDoc, true, "Uploading...");
   try {
-    const doc = await api("/documents", { method: "POST", body: fd });
-    setStatus(ui.docStatus, `Uploaded ${doc.filename} (${shortId(doc.id)})`, "success");
-    showToast("Document uploaded. Indexing in background.", "success");
-    setAppStatus("Document uploaded");
+    if (files.length > 1 || ARCHIVE_PATTERN.test(files[0].name)) {
+      await uploadBulk(files);
+    } else {
+      const fd = new FormData();
+      fd.append("file", files[0]);
+      const doc = await api("/documents", { method: "POST", body: fd });
+      setStatus(ui.docStatus, `Uploaded ${doc.filename} (${shortId(doc.id)})`, "success");
+    }
+    showToast("Upload complete. Indexing in background.", "success");
+    setAppStatus("Documents uploaded");
     await refreshDocuments();
   } catch (err) {
     setStatus(ui.docStatus, err.message || "Upload failed.", "error");
@@ -703,6 +738,27 @@ ui.generateAnswers.onclick = async () => {
   }
 };
 
+if (ui.refreshStale) {
+  ui.refreshStale.onclick = async () => {
+    if (!state.currentProjectId) {
+      showToast("Select a project first.", "warn");
+      return;
+    }
+    setBusy(ui.refreshStale, true, "Checking...");
+    try {
+      await api(`/projects/${state.currentProjectId}/generate?only_changed=true`, { method: "POST" });
+      showToast("Regenerating answers whose evidence changed.", "success");
+      setAppStatus("Generating answers...");
+      pollGenerationStatus(state.currentProjectId);
+    } catch (err) {
+      showToast(err.message || "Failed to queue regeneration.", "error");
+      setAppStatus("Generation request failed");
+    } finally {
+      setBusy(ui.refreshStale, false);
+    }
+  };
+}
+
 ui.refreshProject.onclick = async () => {
   if (!state.currentProjectId) return;
   await loadProject(state.currentProjectId);
@@ -733,7 +789,18 @@ ui.runEval.onclick = async () => {
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ ground_truth: data }),
     });
-    ui.evalResult.textContent = JSON.stringify(result.evaluation.metrics, null, 2);
+    setAppStatus("Evaluating...");
+    let evaluation = result.evaluation;
+    while (evaluation.status === "PENDING" || evaluation.status === "RUNNING") {
+      const progress = evaluation.metrics?.progress || {};
+      ui.evalResult.textContent = `Scoring ${progress.completed ?? 0}/${progress.total ?? "?"} answers...`;
+      await wait(1500);
+      evaluation = await api(`/evaluations/${evaluation.id}`);
+    }
+    if (evaluation.status !== "COMPLETED") {
+      throw new Error("Evaluation failed.");
+    }
+    ui.evalResult.textContent = JSON.stringify(evaluation.metrics, null, 2);
     showToast("Evaluation completed.", "success");
     setAppStatus("Evaluation completed");
   } catch (err) {
@@ -745,6 +812,69 @@ ui.runEval.onclick = async () => {
   }
 };
 
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary >= 0) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = "message";
+      const data = [];
+      raw.split("\n").forEach((line) => {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        if (line.startsWith("data:")) data.push(line.slice(5).trim());
+      });
+      if (data.length) onEvent(event, JSON.parse(data.join("\n")));
+      boundary = buffer.indexOf("\n\n");
+    }
+  }
+};
+
+if (ui.sendChat) {
+  ui.sendChat.onclick = async () => {
+    const queryText = ui.chatQuery.value.trim();
+    if (!queryText) return;
+    let answerText = "";
+    ui.chatAnswer.textContent = "";
+    ui.chatMeta.textContent = "Retrieving context...";
+    ui.chatCitations.innerHTML = "";
+    setBusy(ui.sendChat, true, "Asking...");
+    try {
+      const res = await fetch("/chat/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ query: queryText }),
+      });
+      if (!res.ok) {
+        throw new Error((await res.text()) || res.statusText);
+      }
+      await readEventStream(res, (event, data) => {
+        if (event === "citations") {
+          ui.chatMeta.textContent = `Confidence: ${formatConfidence(data.confidence)} - Citations: ${data.citations.length}`;
+          ui.chatCitations.innerHTML = renderCitations(data.citations);
+        } else if (event === "token") {
+          answerText += data.text;
+          ui.chatAnswer.innerHTML = renderText(answerText);
+        } else if (event === "done") {
+          ui.chatAnswer.innerHTML = renderText(data.answer_text);
+        } else if (event === "error") {
+          throw new Error(data.detail || "Chat failed.");
+        }
+      });
+    } catch (err) {
+      showToast(err.message || "Chat failed.", "error");
+    } finally {
+      setBusy(ui.sendChat, false);
+    }
+  };
+}
+
 ui.projectScope.addEventListener("change", handleScopeToggle);
 
 if (ui.evalSearch) {
@@ -0,0 +1,107 @@
+"""Initial schema, as created by Base.metadata.create_all in the first release.
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_initial_schema"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+project_scope = sa.Enum("ALL_DOCS", "SELECTED_DOCS", name="projectscope")
+project_status = sa.Enum(
+    "CREATED", "PARSING", "READY", "GENERATING", "OUTDATED", "REVIEW", "EVALUATING", "EVALUATED", "FAILED",
+    name="projectstatus",
+)
+document_status = sa.Enum("UPLOADED", "PARSED", "INDEXED", "FAILED", name="documentstatus")
+answer_status = sa.Enum(
+    "PENDING", "GENERATED", "CONFIRMED", "REJECTED", "MANUAL_UPDATED", "MISSING_DATA", "STALE",
+    name="answerstatus",
+)
+evaluation_status = sa.Enum("PENDING", "COMPLETED", "FAILED", name="evaluationstatus")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "projects",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("scope", project_scope, nullable=False),
+        sa.Column("status", project_status, nullable=False),
+        sa.Column("config", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "documents",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("filename", sa.String(255), nullable=False),
+        sa.Column("content_type", sa.String(120), nullable=False),
+        sa.Column("status", document_status, nullable=False),
+        sa.Column("storage_path", sa.String(500), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "project_documents",
+        sa.Column("project_id", sa.String(36), sa.ForeignKey("projects.id"), primary_key=True),
+        sa.Column("document_id", sa.String(36), sa.ForeignKey("documents.id"), primary_key=True),
+    )
+    op.create_table(
+        "document_chunks",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("document_id", sa.String(36), sa.ForeignKey("documents.id"), nullable=False),
+        sa.Column("chunk_index", sa.Integer(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("page", sa.Integer(), nullable=True),
+        sa.Column("bbox", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "questions",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("project_id", sa.String(36), sa.ForeignKey("projects.id"), nullable=False),
+        sa.Column("section", sa.String(255), nullable=True),
+        sa.Column("order_index", sa.Integer(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+    )
+    op.create_table(
+        "answers",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("question_id", sa.String(36), sa.ForeignKey("questions.id"), nullable=False),
+        sa.Column("status", answer_status, nullable=False),
+        sa.Column("ai_answer_text", sa.Text(), nullable=True),
+        sa.Column("ai_answerable", sa.Boolean(), nullable=True),
+        sa.Column("ai_confidence", sa.Float(), nullable=True),
+        sa.Column("ai_citations", sa.JSON(), nullable=True),
+        sa.Column("manual_answer_text", sa.Text(), nullable=True),
+        sa.Column("manual_answerable", sa.Boolean(), nullable=True),
+        sa.Column("manual_updated_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "evaluations",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("project_id", sa.String(36), sa.ForeignKey("projects.id"), nullable=False),
+        sa.Column("status", evaluation_status, nullable=False),
+        sa.Column("metrics", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    for table in (
+        "evaluations", "answers", "questions", "document_chunks", "project_documents", "documents", "projects",
+    ):
+        op.drop_table(table)
+    bind = op.get_bind()
+    for enum in (evaluation_status, answer_status, document_status, project_status, project_scope):
+        enum.drop(bind, checkfirst=True)
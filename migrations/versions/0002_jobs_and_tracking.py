@@ -0,0 +1,65 @@
+"""Add the job queue, incremental indexing columns and the RUNNING evaluation status.
+
+Databases created by create_all partway through these changes may already have some of
+them, so each step only runs when its table or column is missing.
+
+Revision ID: 0002_jobs_and_tracking
+Revises: 0001_initial_schema
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_jobs_and_tracking"
+down_revision = "0001_initial_schema"
+branch_labels = None
+depends_on = None
+
+
+job_status = sa.Enum("QUEUED", "RUNNING", "COMPLETED", "FAILED", name="jobstatus")
+
+def _columns() -> list[tuple[str, sa.Column]]:
+    return [
+        ("documents", sa.Column("indexed_chunks", sa.Integer(), nullable=False, server_default="0")),
+        ("document_chunks", sa.Column("content_hash", sa.String(64), nullable=True)),
+        ("answers", sa.Column("context_chunk_ids", sa.JSON(), nullable=True)),
+    ]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE evaluationstatus ADD VALUE IF NOT EXISTS 'RUNNING' AFTER 'PENDING'")
+
+    if "jobs" not in inspector.get_table_names():
+        op.create_table(
+            "jobs",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("kind", sa.String(64), nullable=False),
+            sa.Column("payload", sa.JSON(), nullable=False),
+            sa.Column("status", job_status, nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("max_attempts", sa.Integer(), nullable=False),
+            sa.Column("progress", sa.Float(), nullable=False),
+            sa.Column("detail", sa.String(255), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("run_after", sa.DateTime(), nullable=False),
+            sa.Column("locked_by", sa.String(255), nullable=True),
+            sa.Column("locked_at", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+
+    for table, column in _columns():
+        if column.name not in {existing["name"] for existing in inspector.get_columns(table)}:
+            op.add_column(table, column)
+
+
+def downgrade() -> None:
+    for table, column in reversed(_columns()):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column.name)
+    op.drop_table("jobs")
+    job_status.drop(op.get_bind(), checkfirst=True)
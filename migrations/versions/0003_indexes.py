@@ -0,0 +1,45 @@
+"""Index foreign keys and sort columns; allow one answer per question.
+
+Revision ID: 0003_indexes
+Revises: 0002_jobs_and_tracking
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0003_indexes"
+down_revision = "0002_jobs_and_tracking"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ("ix_projects_created_at", "projects", ["created_at", "id"]),
+    ("ix_projects_scope", "projects", ["scope"]),
+    ("ix_documents_created_at", "documents", ["created_at", "id"]),
+    ("ix_project_documents_document_id", "project_documents", ["document_id"]),
+    ("ix_document_chunks_document_id", "document_chunks", ["document_id", "chunk_index"]),
+    ("ix_questions_project_id", "questions", ["project_id", "order_index"]),
+    ("ix_answers_status", "answers", ["status"]),
+    ("ix_answers_created_at", "answers", ["created_at"]),
+    ("ix_evaluations_project_id", "evaluations", ["project_id", "created_at"]),
+    ("ix_jobs_status_run_after", "jobs", ["status", "run_after"]),
+)
+
+
+def upgrade() -> None:
+    # Keep the most recently updated answer when a question somehow has several.
+    op.execute(
+        "DELETE FROM answers WHERE id IN ("
+        "SELECT a.id FROM answers a JOIN answers b ON a.question_id = b.question_id "
+        "AND (a.updated_at < b.updated_at OR (a.updated_at = b.updated_at AND a.id < b.id)))"
+    )
+    op.create_index("uq_answers_question_id", "answers", ["question_id"], unique=True)
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    op.drop_index("uq_answers_question_id", table_name="answers")
@@ -0,0 +1,25 @@
+"""Store a content hash per document so bulk uploads can skip identical files.
+
+Revision ID: 0004_document_content_hash
+Revises: 0003_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_document_content_hash"
+down_revision = "0003_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_index("ix_documents_content_hash", "documents", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_documents_content_hash", table_name="documents")
+    with op.batch_alter_table("documents") as batch:
+        batch.drop_column("content_hash")
@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+# Settings are read at import time, so the test environment is fixed before any backend module loads.
+_root = tempfile.mkdtemp(prefix="qa-tests-")
+os.environ["QA_DATABASE_URL"] = f"sqlite:///{_root}/app.db"
+os.environ["QA_VECTOR_STORE"] = "flat"
+os.environ["QA_FLAT_INDEX_PATH"] = f"{_root}/flat"
+os.environ["QA_CHROMA_PATH"] = f"{_root}/chroma"
+os.environ["QA_LEXICAL_INDEX_PATH"] = f"{_root}/lexical.sqlite3"
+os.environ["QA_STORAGE_PATH"] = f"{_root}/documents"
+os.environ["QA_EMBED_CACHE_PATH"] = f"{_root}/cache/embeddings.sqlite3"
+os.environ["QA_LLM_CACHE_PATH"] = f"{_root}/cache/llm.sqlite3"
+os.environ["QA_EMBEDDED_WORKERS"] = "0"
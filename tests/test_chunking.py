@@ -0,0 +1,15 @@
+from backend.services.chunking import iter_chunks
+
+
+def _sheet(text: str) -> dict:
+    return {"text": text, "page": None, "bbox": None, "kind": "table", "title": "Two"}
+
+
+def test_single_row_sheet_emits_header_once():
+    chunks = list(iter_chunks([_sheet("a")], name="structured"))
+    assert [chunk["text"] for chunk in chunks] == ["Two\na"]
+
+
+def test_table_rows_repeat_header():
+    chunks = list(iter_chunks([_sheet("name\tvalue\nalpha\t1\nbeta\t2")], name="structured"))
+    assert [chunk["text"] for chunk in chunks] == ["Two\nname\tvalue\nalpha\t1\nbeta\t2"]
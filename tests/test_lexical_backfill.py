@@ -0,0 +1,36 @@
+import ai.retriever as retriever
+from ai.vector_store import get_vector_store
+from backend.db import SessionLocal, upgrade_database
+from backend.models import Document, DocumentChunk, DocumentStatus
+from backend.services.indexing import backfill_lexical_index
+
+QUESTION = "Which control covers CC6.1?"
+VECTORS = {QUESTION: [1.0, 0.0], "distractor": [1.0, 0.1], "target": [0.0, 1.0]}
+
+
+def test_hybrid_finds_chunks_indexed_before_the_lexical_index(monkeypatch):
+    upgrade_database()
+    monkeypatch.setattr(retriever, "embed_texts", lambda texts: [VECTORS[text] for text in texts])
+    with SessionLocal() as db:
+        doc = Document(filename="policy.txt", content_type="text/plain", status=DocumentStatus.INDEXED, storage_path="")
+        db.add(doc)
+        db.commit()
+        chunks = {
+            "distractor": DocumentChunk(document_id=doc.id, chunk_index=0, text="Office hours and holidays."),
+            "target": DocumentChunk(document_id=doc.id, chunk_index=1, text="Control CC6.1 restricts logical access."),
+        }
+        db.add_all(chunks.values())
+        db.commit()
+        # Only the vector store has these chunks, as for a corpus ingested before the keyword index.
+        get_vector_store().upsert(
+            [chunk.id for chunk in chunks.values()],
+            [chunk.text for chunk in chunks.values()],
+            [VECTORS[name] for name in chunks],
+            [{"document_id": doc.id, "chunk_id": chunk.id, "chunk_index": chunk.chunk_index} for chunk in chunks.values()],
+        )
+        target_id = chunks["target"].id
+
+        assert retriever.query(QUESTION, 1, mode="hybrid")["ids"] != [[target_id]]
+        assert backfill_lexical_index(db) == 1
+        assert retriever.query(QUESTION, 1, mode="hybrid")["ids"] == [[target_id]]
+        assert backfill_lexical_index(db) == 0